@@ -0,0 +1,112 @@
+"""Описание ресурсов API: какие поля отдаются и откуда они берутся.
+
+Списки читаются через `.values()` только нужными колонками и
+кодируются в JSON построчно, поэтому объекты моделей не создаются,
+а размер страницы почти не влияет на расход памяти.
+"""
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+def media_url(name):
+    return settings.MEDIA_URL + name if name else None
+
+
+class Resource:
+    """Поля ресурса: имя в ответе -> путь для `.values()`.
+
+    `?fields=` оставляет в ответе только перечисленные поля (sparse
+    fieldsets); колонки из `required` читаются всегда - по ним строится
+    курсор.
+    """
+
+    fields = {}
+    required = ()
+    converters = {}
+
+    def select(self, requested=None):
+        """Имена запрошенных полей; ValueError для неизвестных."""
+        if not requested:
+            return list(self.fields)
+        names = [name.strip() for name in requested.split(',')]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ValueError(', '.join(unknown))
+        return names
+
+    def values(self, queryset, names):
+        paths = {self.fields[name] for name in names} | set(self.required)
+        return queryset.values(*paths)
+
+    def project(self, row, names):
+        data = {}
+        for name in names:
+            value = row[self.fields[name]]
+            convert = self.converters.get(name)
+            data[name] = convert(value) if convert else value
+        return data
+
+
+class PostResource(Resource):
+    fields = {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+        'comments_count': 'comments_count',
+    }
+    required = ('id', 'pub_date')
+    converters = {'image': media_url}
+
+
+class CommentResource(Resource):
+    fields = {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }
+    required = ('id', 'created')
+
+
+class GroupResource(Resource):
+    fields = {
+        'id': 'id',
+        'title': 'title',
+        'slug': 'slug',
+        'description': 'description',
+        'posts_count': 'posts_count',
+    }
+
+
+class UserResource(Resource):
+    fields = {
+        'username': 'username',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'posts_count': 'posts_count',
+    }
+
+
+class FollowResource(Resource):
+    fields = {
+        'user': 'user__username',
+        'author': 'author__username',
+    }
+
+
+def stream_list(resource, rows, names, **extra):
+    """Куски JSON-ответа `{"results": [...], **extra}` по одной строке."""
+    encoder = DjangoJSONEncoder()
+    yield '{"results": ['
+    for number, row in enumerate(rows):
+        if number:
+            yield ', '
+        yield encoder.encode(resource.project(row, names))
+    yield ']'
+    for key, value in extra.items():
+        yield f', {encoder.encode(key)}: {encoder.encode(value)}'
+    yield '}'
@@ -0,0 +1,178 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def content(response):
+    if response.streaming:
+        return json.loads(b''.join(response.streaming_content))
+    return json.loads(response.content)
+
+
+@override_settings(TASKS_EAGER=True)
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='api_author')
+        cls.reader = User.objects.create_user(username='api_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='api-group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author,
+                group=cls.group if number % 2 else None,
+            )
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_post_list_pages_by_cursor(self):
+        url = reverse('api:post_list')
+        first = content(self.client.get(url, {'limit': 3}))
+        self.assertEqual(
+            [post['id'] for post in first['results']],
+            [post.pk for post in self.posts[:-4:-1]],
+        )
+        self.assertIsNone(first['previous_cursor'])
+        second = content(self.client.get(
+            url, {'limit': 3, 'cursor': first['next_cursor']}
+        ))
+        self.assertEqual(
+            [post['id'] for post in second['results']],
+            [self.posts[1].pk, self.posts[0].pk],
+        )
+        self.assertIsNone(second['next_cursor'])
+
+    def test_sparse_fields_and_filters(self):
+        response = self.client.get(reverse('api:post_list'), {
+            'fields': 'id,group', 'group': self.group.slug,
+        })
+        results = content(response)['results']
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0], {
+            'id': self.posts[3].pk, 'group': self.group.slug,
+        })
+        response = self.client.get(
+            reverse('api:post_list'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_reads_values_not_models(self):
+        """Список читает только запрошенные колонки одним запросом."""
+        with self.assertNumQueries(1) as context:
+            content(Client().get(
+                reverse('api:post_list'), {'fields': 'id,text'}
+            ))
+        sql = context.captured_queries[-1]['sql']
+        self.assertNotIn('"image"', sql)
+        self.assertNotIn('auth_user', sql)
+
+    def test_csrf_failure_is_json(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.reader)
+        response = client.post(reverse('api:post_list'), {'text': 'Без'})
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('detail', content(response))
+        self.assertFalse(Post.objects.filter(text='Без').exists())
+
+    def test_etag_gives_not_modified(self):
+        url = reverse('api:post_detail', args=[self.posts[0].pk])
+        response = self.client.get(url)
+        self.assertEqual(content(response)['text'], 'Пост 0')
+        etag = response['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        Comment.objects.create(
+            post=self.posts[0], author=self.reader, text='Новый'
+        )
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
+
+    def test_create_and_edit_post(self):
+        response = self.client.post(
+            reverse('api:post_list'),
+            json.dumps({'text': 'Из API', 'group': self.group.slug}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        created = content(response)
+        self.assertEqual(
+            (created['author'], created['group']),
+            (self.reader.username, self.group.slug),
+        )
+        url = reverse('api:post_detail', args=[created['id']])
+        response = self.client.patch(
+            url, json.dumps({'text': 'Исправлено'}),
+            content_type='application/json',
+        )
+        self.assertEqual(content(response)['text'], 'Исправлено')
+        self.assertEqual(content(response)['group'], self.group.slug)
+
+        response = self.client.patch(
+            reverse('api:post_detail', args=[self.posts[0].pk]),
+            json.dumps({'text': 'Чужой'}), content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 403)
+        response = Client().post(reverse('api:post_list'), {'text': 'Аноним'})
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post(reverse('api:post_list'), {'text': ''})
+        self.assertIn('text', content(response)['errors'])
+
+    def test_comments(self):
+        post = self.posts[0]
+        url = reverse('api:comment_list', args=[post.pk])
+        response = self.client.post(url, {'text': 'Отлично'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            content(self.client.get(url))['results'][0]['text'], 'Отлично'
+        )
+
+    def test_follows_and_feed(self):
+        response = self.client.post(
+            reverse('api:follow_list'), {'author': self.author.username}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(
+            Follow.objects.filter(user=self.reader, author=self.author)
+            .exists()
+        )
+        self.assertEqual(
+            content(self.client.get(reverse('api:follow_list')))['results'],
+            [{'user': self.reader.username, 'author': self.author.username}],
+        )
+        feed = content(self.client.get(reverse('api:feed')))['results']
+        self.assertEqual(len(feed), 5)
+        response = self.client.delete(
+            reverse('api:follow_detail', args=[self.author.username])
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            Client().get(reverse('api:feed')).status_code, 401
+        )
+
+    def test_groups_and_users(self):
+        groups = content(self.client.get(reverse('api:group_list')))
+        self.assertEqual(groups['results'][0]['slug'], self.group.slug)
+        self.assertEqual(groups['results'][0]['posts_count'], 2)
+        user = content(self.client.get(
+            reverse('api:user_detail', args=[self.author.username])
+        ))
+        self.assertEqual(user['posts_count'], 5)
+        response = self.client.get(reverse('api:group_detail', args=['no']))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(content(response)['detail'], 'Не найдено')
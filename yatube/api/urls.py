@@ -0,0 +1,32 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    # Посты: список с фильтрами ?group= и ?author=, создание
+    path('posts/', views.post_list, name='post_list'),
+
+    # Пост: чтение и изменение автором
+    path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+
+    # Комментарии к посту
+    path('posts/<int:post_id>/comments/', views.comment_list,
+         name='comment_list'),
+
+    # Группы
+    path('groups/', views.group_list, name='group_list'),
+    path('groups/<slug:slug>/', views.group_detail, name='group_detail'),
+
+    # Профиль автора
+    path('users/<str:username>/', views.user_detail, name='user_detail'),
+
+    # Лента подписок
+    path('feed/', views.feed, name='feed'),
+
+    # Подписки текущего пользователя: список, подписка, отписка
+    path('follows/', views.follow_list, name='follow_list'),
+    path('follows/<str:username>/', views.follow_detail,
+         name='follow_detail'),
+]
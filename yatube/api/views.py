@@ -0,0 +1,318 @@
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.db import transaction
+from django.http import (
+    Http404, HttpResponse, JsonResponse, QueryDict, StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404
+
+from posts.counters import user_stats
+from posts.forms import CommentForm, PostForm
+from posts.http_cache import (
+    conditional_page, follow_scopes, group_scopes, index_scopes,
+    post_scopes, profile_scopes,
+)
+from posts.models import Comment, Follow, Group, Post, User
+from posts.paginators import (
+    CURSOR_PARAM, CommentPaginator, CursorPaginator, TimelinePaginator,
+    decode_cursor,
+)
+from posts.timeline import Timeline
+
+from .resources import (
+    CommentResource, FollowResource, GroupResource, PostResource,
+    UserResource, stream_list,
+)
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+posts_resource = PostResource()
+comments_resource = CommentResource()
+groups_resource = GroupResource()
+users_resource = UserResource()
+follows_resource = FollowResource()
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def error_response(status, detail):
+    key = 'errors' if isinstance(detail, dict) else 'detail'
+    return JsonResponse({key: detail}, status=status)
+
+
+def api_view(*methods):
+    """Декоратор view API: разрешённые методы, вход для записи,
+    ошибки в JSON и транзакция для изменяющих запросов."""
+    allowed = set(methods) | ({'HEAD'} if 'GET' in methods else set())
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in allowed:
+                response = error_response(405, 'Метод не поддерживается')
+                response['Allow'] = ', '.join(sorted(allowed))
+                return response
+            safe = request.method in SAFE_METHODS
+            if not safe and not request.user.is_authenticated:
+                return error_response(401, 'Требуется вход')
+            try:
+                if safe:
+                    return view(request, *args, **kwargs)
+                with transaction.atomic():
+                    return view(request, *args, **kwargs)
+            except Http404:
+                return error_response(404, 'Не найдено')
+            except ApiError as error:
+                return error_response(error.status, error.detail)
+        return wrapper
+    return decorator
+
+
+def login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error_response(401, 'Требуется вход')
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def request_data(request):
+    """Тело запроса: JSON или форма, для PATCH - тоже."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            raise ApiError(400, 'Некорректный JSON')
+        if not isinstance(data, dict):
+            raise ApiError(400, 'Ожидается JSON-объект')
+        return data
+    if request.method == 'POST':
+        return request.POST.dict()
+    return QueryDict(request.body, encoding=request.encoding).dict()
+
+
+def fields(request, resource):
+    try:
+        return resource.select(request.GET.get('fields'))
+    except ValueError as error:
+        raise ApiError(400, f'Неизвестные поля: {error}')
+
+
+def page_size(request):
+    try:
+        size = int(request.GET['limit'])
+    except (KeyError, ValueError):
+        return settings.API_PAGE_SIZE
+    return min(max(size, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def stream(resource, rows, names, **extra):
+    return StreamingHttpResponse(
+        stream_list(resource, rows, names, **extra),
+        content_type='application/json',
+    )
+
+
+def paginated(request, resource, queryset, paginator_class=CursorPaginator):
+    """Страница списка по курсору, закодированная построчно."""
+    names = fields(request, resource)
+    paginator = paginator_class(
+        resource.values(queryset, names), page_size(request)
+    )
+    return cursor_page(request, resource, names, paginator)
+
+
+def cursor_page(request, resource, names, paginator):
+    token = request.GET.get(CURSOR_PARAM)
+    cursor = decode_cursor(token) if token else None
+    page = paginator.get_cursor_page(cursor)
+    return stream(
+        resource, page.object_list, names,
+        next_cursor=page.next_cursor,
+        previous_cursor=page.previous_cursor,
+    )
+
+
+def detail(request, resource, queryset, status=200):
+    names = fields(request, resource)
+    row = resource.values(queryset, names).first()
+    if row is None:
+        raise Http404
+    return JsonResponse(resource.project(row, names), status=status)
+
+
+def form_errors(form):
+    return ApiError(400, {
+        field: [error['message'] for error in errors]
+        for field, errors in form.errors.get_json_data().items()
+    })
+
+
+def post_form(request, post=None):
+    """PostForm по данным API: группа задаётся slug, а у PATCH
+    отсутствующие поля берутся из поста."""
+    data = request_data(request)
+    if data.get('group'):
+        group_id = Group.objects.filter(slug=data['group']).values_list(
+            'pk', flat=True
+        ).first()
+        if group_id is None:
+            raise ApiError(400, {'group': ['Группа не найдена']})
+        data['group'] = group_id
+    if post is not None:
+        data = {'text': post.text, 'group': post.group_id, **data}
+    form = PostForm(data, files=request.FILES or None, instance=post)
+    if not form.is_valid():
+        raise form_errors(form)
+    return form
+
+
+@api_view('GET', 'POST')
+@conditional_page(index_scopes)
+def post_list(request):
+    if request.method == 'POST':
+        post = post_form(request).save(commit=False)
+        post.author = request.user
+        post.save()
+        return detail(request, posts_resource,
+                      Post.objects.filter(pk=post.pk), status=201)
+    posts = Post.objects.all()
+    if request.GET.get('group'):
+        posts = posts.filter(group__slug=request.GET['group'])
+    if request.GET.get('author'):
+        posts = posts.filter(author__username=request.GET['author'])
+    return paginated(request, posts_resource, posts)
+
+
+@api_view('GET', 'PATCH')
+@conditional_page(post_scopes)
+def post_detail(request, post_id):
+    if request.method == 'PATCH':
+        post = get_object_or_404(Post, pk=post_id)
+        if post.author_id != request.user.pk:
+            raise ApiError(403, 'Изменять пост может только автор')
+        post = post_form(request, post).save(commit=False)
+        # Счётчики в строке поста меняются в обход формы, не затираем их.
+        post.save(update_fields=['text', 'group', 'image'])
+    return detail(request, posts_resource, Post.objects.filter(pk=post_id))
+
+
+@api_view('GET', 'POST')
+@conditional_page(post_scopes)
+def comment_list(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    if request.method == 'POST':
+        form = CommentForm(request_data(request))
+        if not form.is_valid():
+            raise form_errors(form)
+        comment = form.save(commit=False)
+        comment.author = request.user
+        comment.post = post
+        comment.save()
+        return detail(request, comments_resource,
+                      Comment.objects.filter(pk=comment.pk), status=201)
+    return paginated(request, comments_resource,
+                     Comment.objects.filter(post=post), CommentPaginator)
+
+
+def group_list_scopes(request):
+    return ['posts', 'groups']
+
+
+@api_view('GET')
+@conditional_page(group_list_scopes)
+def group_list(request):
+    names = fields(request, groups_resource)
+    groups = groups_resource.values(
+        Group.objects.order_by('title', 'pk'), names
+    )
+    return stream(groups_resource, groups.iterator(), names)
+
+
+@api_view('GET')
+@conditional_page(group_scopes)
+def group_detail(request, slug):
+    return detail(request, groups_resource, Group.objects.filter(slug=slug))
+
+
+@api_view('GET')
+@conditional_page(profile_scopes)
+def user_detail(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    row = {
+        'username': author.username,
+        'first_name': author.first_name,
+        'last_name': author.last_name,
+        'posts_count': user_stats(author).posts_count,
+    }
+    return JsonResponse(users_resource.project(
+        row, fields(request, users_resource)
+    ))
+
+
+@api_view('GET')
+@login_required
+@conditional_page(follow_scopes)
+def feed(request):
+    names = fields(request, posts_resource)
+    timeline = Timeline(
+        request.user, posts_resource.values(Post.objects.all(), names)
+    )
+    return cursor_page(
+        request, posts_resource, names,
+        TimelinePaginator(timeline, page_size(request)),
+    )
+
+
+def follow_list_scopes(request):
+    return [f'timeline:{request.user.pk}']
+
+
+@api_view('GET', 'POST')
+@login_required
+@conditional_page(follow_list_scopes)
+def follow_list(request):
+    if request.method == 'POST':
+        username = request_data(request).get('author')
+        author = User.objects.filter(username=username).first()
+        if author is None:
+            raise ApiError(400, {'author': ['Автор не найден']})
+        if author == request.user:
+            raise ApiError(400, {'author': ['Нельзя подписаться на себя']})
+        _, created = Follow.objects.get_or_create(
+            user=request.user, author=author
+        )
+        return detail(
+            request, follows_resource,
+            Follow.objects.filter(user=request.user, author=author),
+            status=201 if created else 200,
+        )
+    names = fields(request, follows_resource)
+    follows = follows_resource.values(
+        Follow.objects.filter(user=request.user).order_by(
+            'author__username'
+        ),
+        names,
+    )
+    return stream(follows_resource, follows.iterator(), names)
+
+
+@api_view('DELETE')
+def follow_detail(request, username):
+    author = get_object_or_404(User, username=username)
+    deleted, _ = Follow.objects.filter(
+        user=request.user, author=author
+    ).delete()
+    if not deleted:
+        raise Http404
+    return HttpResponse(status=204)
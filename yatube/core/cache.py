@@ -0,0 +1,65 @@
+"""Защита от «набегания» (dogpile) на общий кеш.
+
+Значение хранится вместе со сроком свежести. Когда срок истекает,
+пересчитывает его только тот процесс, который успел взять блокировку
+через `cache.add()`, а остальные ещё `CACHE_STALE_GRACE` секунд
+отдают прежнее значение. Если значения нет совсем, остальные
+процессы коротко ждут результата вместо параллельного пересчёта.
+
+Блокировка требует атомарного `add()`: он есть у LocMemCache,
+DatabaseCache и memcached, но не у FileBasedCache.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+LOCK_SUFFIX = ':lock'
+WAIT_STEP = 0.05
+
+
+def stale_grace():
+    return getattr(settings, 'CACHE_STALE_GRACE', 60)
+
+
+def lock_timeout():
+    return getattr(settings, 'CACHE_LOCK_TIMEOUT', 10)
+
+
+def _store(cache, key, value, timeout):
+    fresh_until = time.time() + timeout
+    cache.set(key, (fresh_until, value), timeout + stale_grace())
+    return value
+
+
+def _regenerate(cache, key, producer, timeout):
+    lock_key = key + LOCK_SUFFIX
+    try:
+        return _store(cache, key, producer(), timeout)
+    finally:
+        cache.delete(lock_key)
+
+
+def get_or_set_coalesced(key, producer, timeout, alias='default'):
+    """Возвращает значение из кеша; пересчитывает его не более одного
+    процесса одновременно."""
+    cache = caches[alias]
+    lock_key = key + LOCK_SUFFIX
+    entry = cache.get(key)
+    if entry is not None:
+        fresh_until, value = entry
+        if fresh_until > time.time():
+            return value
+        if cache.add(lock_key, True, lock_timeout()):
+            return _regenerate(cache, key, producer, timeout)
+        return value
+    if cache.add(lock_key, True, lock_timeout()):
+        return _regenerate(cache, key, producer, timeout)
+    deadline = time.time() + lock_timeout()
+    while time.time() < deadline:
+        time.sleep(WAIT_STEP)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[1]
+    # Держатель блокировки не успел: считаем сами, но не ждём дальше.
+    return _store(cache, key, producer(), timeout)
@@ -0,0 +1,16 @@
+"""Настройка новых соединений с базой."""
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Выполняет `settings.SQLITE_PRAGMAS` для каждого соединения SQLite.
+
+    journal_mode=wal хранится в самом файле базы, но повторная установка
+    дешёвая и покрывает базы, созданные до включения режима.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,82 @@
+"""Маршрутизация запросов между основной базой и репликами.
+
+Пишет всегда основная база. Читать с реплики разрешает только
+`ReplicaMiddleware` на время безопасного HTTP-запроса; команды,
+фоновые потоки и открытые транзакции читают основную базу и не видят
+отставания реплик.
+
+Запись в служебные таблицы (`UNTRACKED_WRITES`) не считается записью
+пользователя: из-за неё запрос не переводится на основную базу.
+Кеш Django в базе (DatabaseCache) вдобавок всегда читается с основной:
+поколения лент и блокировки с отстающей реплики были бы устаревшими.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = threading.local()
+
+PRIMARY_ONLY = {'django_cache.cacheentry'}
+# Строка счётчиков создаётся при первом показе профиля, в том числе
+# на GET.
+UNTRACKED_WRITES = PRIMARY_ONLY | {'posts.userstats'}
+
+
+def _label(model):
+    # У модели DatabaseCache нет label_lower: это не модель приложения.
+    return f'{model._meta.app_label}.{model._meta.model_name}'
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def request_routing(use_replicas):
+    """Состояние маршрутизации одного запроса; после выхода `wrote`
+    показывает, была ли запись в основную базу."""
+    _state.use_replicas = use_replicas
+    _state.wrote = False
+    try:
+        yield _state
+    finally:
+        _state.use_replicas = False
+
+
+def read_source():
+    """Откуда читает текущий запрос: 'replica' или 'primary'. Входит
+    в ключи общих кешей, собранных из прочитанного: фрагмент, собранный
+    по отстающей реплике, не должен достаться тому, кто после своей
+    записи читает основную базу."""
+    if replicas() and getattr(_state, 'use_replicas', False):
+        return 'replica'
+    return 'primary'
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not (aliases and getattr(_state, 'use_replicas', False)):
+            return DEFAULT_DB_ALIAS
+        if _label(model) in PRIMARY_ONLY:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Внутри транзакции читается то, что она сама записала.
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        if _label(model) not in UNTRACKED_WRITES:
+            _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Все базы содержат одни и те же данные.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема реплик приходит с репликацией.
+        return db not in replicas()
@@ -0,0 +1,268 @@
+"""Замеры стоимости запросов: время, SQL, шаблоны и кеш.
+
+Замеряется доля запросов INSTRUMENTATION_SAMPLE_RATE, остальные
+проходят без обёрток. Для выбранного запроса считаются общее время,
+время и число SQL-запросов (через `connection.execute_wrapper`),
+повторяющиеся запросы по отпечатку SQL, время рендеринга шаблонов
+и попадания в кеш. Итог уходит в заголовок Server-Timing, в лог
+`core.instrumentation` и в сводку по именам URL, которую отдаёт
+`core:instrumentation_stats`. Сводка хранится в памяти процесса:
+у каждого воркера своя.
+"""
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+_lock = threading.Lock()
+_stats = {}
+_MISSING = object()
+
+# Сколько отпечатков повторяющихся запросов хранить на один URL.
+DUPLICATES_KEPT = 10
+
+_SPACES_RE = re.compile(r'\s+')
+_PLACEHOLDERS_RE = re.compile(r'%s(, %s)+')
+
+
+def sample_rate():
+    return getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 0)
+
+
+def should_sample():
+    rate = sample_rate()
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def fingerprint(sql):
+    """Отпечаток запроса: списки IN разной длины дают один отпечаток."""
+    normalized = _PLACEHOLDERS_RE.sub('%s, ...', _SPACES_RE.sub(' ', sql))
+    return hashlib.md5(normalized.encode()).hexdigest()[:12]
+
+
+class Sample:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.db_time = 0.0
+        self.queries = Counter()
+        self.examples = {}
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            key = fingerprint(sql)
+            self.queries[key] += 1
+            self.examples.setdefault(key, sql)
+
+    def stop(self):
+        self.total = time.perf_counter() - self.started
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicates(self):
+        return {key: count for key, count in self.queries.items()
+                if count > 1}
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};'
+            f'desc="queries={self.query_count} '
+            f'duplicates={len(self.duplicates)}"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="hits={self.cache_hits} '
+            f'misses={self.cache_misses}"',
+            f'total;dur={self.total * 1000:.1f}',
+        ])
+
+
+def current():
+    return getattr(_state, 'sample', None)
+
+
+@contextmanager
+def sampling():
+    """Замеряет код внутри блока в текущем потоке."""
+    sample = Sample()
+    _state.sample = sample
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(sample))
+            yield sample
+    finally:
+        _state.sample = None
+        sample.stop()
+
+
+def view_name(request):
+    """Имя URL вида `posts:index`: по имени приложения, а не по
+    пространству имён из include()."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return 'unresolved'
+    return ':'.join([*match.app_names, match.url_name])
+
+
+def record(name, sample, status):
+    """Добавляет замеры запроса в сводку и пишет строку в лог."""
+    duplicates = sample.duplicates
+    logger.info(
+        '%s %s total=%.1fms db=%.1fms queries=%d duplicates=%s '
+        'tpl=%.1fms cache=%d/%d',
+        name, status, sample.total * 1000, sample.db_time * 1000,
+        sample.query_count, ','.join(sorted(duplicates)) or '-',
+        sample.template_time * 1000, sample.cache_hits, sample.cache_misses,
+    )
+    with _lock:
+        entry = _stats.setdefault(name, {
+            'requests': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'db_ms': 0.0,
+            'queries': 0,
+            'template_ms': 0.0,
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'duplicates': {},
+        })
+        entry['requests'] += 1
+        entry['total_ms'] += sample.total * 1000
+        entry['max_ms'] = max(entry['max_ms'], sample.total * 1000)
+        entry['db_ms'] += sample.db_time * 1000
+        entry['queries'] += sample.query_count
+        entry['template_ms'] += sample.template_time * 1000
+        entry['cache_hits'] += sample.cache_hits
+        entry['cache_misses'] += sample.cache_misses
+        for key, count in duplicates.items():
+            known = entry['duplicates']
+            if key in known or len(known) < DUPLICATES_KEPT:
+                seen = known.setdefault(
+                    key, {'sql': sample.examples[key], 'count': 0}
+                )
+                seen['count'] += count
+
+
+def stats():
+    """Сводка: средние значения по каждому имени URL."""
+    with _lock:
+        snapshot = {name: dict(entry) for name, entry in _stats.items()}
+    result = {}
+    for name, entry in snapshot.items():
+        requests = entry['requests']
+        result[name] = {
+            'requests': requests,
+            'mean_ms': round(entry['total_ms'] / requests, 2),
+            'max_ms': round(entry['max_ms'], 2),
+            'mean_db_ms': round(entry['db_ms'] / requests, 2),
+            'mean_queries': round(entry['queries'] / requests, 2),
+            'mean_template_ms': round(entry['template_ms'] / requests, 2),
+            'cache_hits': entry['cache_hits'],
+            'cache_misses': entry['cache_misses'],
+            'duplicates': dict(entry['duplicates']),
+        }
+    return result
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, context):
+        sample = current()
+        # Вложенные шаблоны (include, extends) входят во время внешнего.
+        if sample is None or sample.template_depth:
+            return render(self, context)
+        sample.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            sample.template_depth -= 1
+            sample.template_time += time.perf_counter() - started
+    return wrapper
+
+
+def _counted_get(get):
+    @wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        sample = current()
+        if sample is None:
+            return get(self, key, default, version=version)
+        sample.cache_depth += 1
+        try:
+            value = get(self, key, _MISSING, version=version)
+        finally:
+            sample.cache_depth -= 1
+        if not sample.cache_depth:
+            if value is _MISSING:
+                sample.cache_misses += 1
+            else:
+                sample.cache_hits += 1
+        return default if value is _MISSING else value
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(self, keys, version=None):
+        sample = current()
+        if sample is None:
+            return get_many(self, keys, version=version)
+        keys = list(keys)
+        # get и get_many в разных бэкендах вызывают друг друга:
+        # считается только внешний вызов.
+        sample.cache_depth += 1
+        try:
+            found = get_many(self, keys, version=version)
+        finally:
+            sample.cache_depth -= 1
+        if not sample.cache_depth:
+            sample.cache_hits += len(found)
+            sample.cache_misses += len(keys) - len(found)
+        return found
+    return wrapper
+
+
+def install():
+    """Оборачивает рендеринг шаблонов и чтение настроенных кешей.
+    Вне замеряемого запроса обёртки только проверяют thread-local."""
+    if not getattr(Template.render, 'instrumented', False):
+        Template.render = _timed_render(Template.render)
+        Template.render.instrumented = True
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        if backend.__dict__.get('instrumented'):
+            continue
+        backend.get = _counted_get(backend.get)
+        backend.get_many = _counted_get_many(backend.get_many)
+        backend.instrumented = True
@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils.module_loading import autodiscover_modules
+
+from core import tasks
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в базе данных.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти.',
+        )
+        parser.add_argument(
+            '--batch', type=int, default=100,
+            help='Сколько задач забирать за раз.',
+        )
+
+    def handle(self, *args, once, batch, **options):
+        # Задачи регистрируются при импорте модулей tasks приложений.
+        autodiscover_modules('tasks')
+        poll = getattr(settings, 'TASKS_POLL_INTERVAL', 1)
+        keep_days = getattr(settings, 'TASKS_KEEP_DONE_DAYS', 7)
+        done = 0
+        purged_at = 0
+        while True:
+            close_old_connections()
+            if time.monotonic() - purged_at > 3600:
+                tasks.purge(keep_days)
+                purged_at = time.monotonic()
+            executed = tasks.run_pending(batch)
+            done += executed
+            if executed:
+                continue
+            if once:
+                break
+            time.sleep(poll)
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {done}'))
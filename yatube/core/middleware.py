@@ -0,0 +1,50 @@
+from django.conf import settings
+
+from . import db_router, instrumentation
+
+STICKY_COOKIE = 'yatube_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaMiddleware:
+    """Безопасные запросы читают с реплик, если браузер недавно ничего
+    не записывал. После записи ставится кука, и следующие
+    REPLICA_STICKY_SECONDS секунд все чтения идут в основную базу."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        use_replicas = (
+            request.method in SAFE_METHODS
+            and STICKY_COOKIE not in request.COOKIES
+        )
+        with db_router.request_routing(use_replicas) as state:
+            response = self.get_response(request)
+        if state.wrote and db_router.replicas():
+            response.set_cookie(
+                STICKY_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_STICKY_SECONDS', 15),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class InstrumentationMiddleware:
+    """Замеряет выбранную долю запросов (`core.instrumentation`)
+    и добавляет к ответу заголовок Server-Timing."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not instrumentation.should_sample():
+            return self.get_response(request)
+        with instrumentation.sampling() as sample:
+            response = self.get_response(request)
+        response['Server-Timing'] = sample.server_timing()
+        instrumentation.record(
+            instrumentation.view_name(request), sample, response.status_code
+        )
+        return response
@@ -0,0 +1,25 @@
+"""Ограничение частоты действий счётчиком в кеше.
+
+Окно фиксированное: счётчик живёт `period` секунд с первого действия
+в окне. На границе окон возможен двойной всплеск, для сглаживания
+рассылок этого достаточно. Кеш должен быть общим для всех процессов,
+иначе лимит считается в каждом отдельно.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def allow(key, limit, period):
+    """Засчитывает действие и сообщает, укладывается ли оно в `limit`
+    действий за `period` секунд."""
+    window = int(time.time() // period)
+    counter = f'ratelimit:{key}:{window}'
+    if cache.add(counter, 1, period):
+        return True
+    try:
+        return cache.incr(counter) <= limit
+    except ValueError:
+        # Счётчик истёк между add и incr: окно только началось.
+        cache.add(counter, 1, period)
+        return True
@@ -0,0 +1,149 @@
+"""Очередь фоновых задач в базе данных.
+
+Задача - функция, помеченная `@task`. `enqueue` записывает её вызов
+в таблицу Task в текущей транзакции, поэтому задача появляется в
+очереди ровно тогда, когда закоммичена породившая её запись. Воркер
+(`manage.py run_worker`) забирает задачи, выполняет их и при ошибке
+повторяет с растущей паузой. Задачи с одинаковым ключом, ещё
+ожидающие запуска, схлопываются в одну, поэтому сами задачи должны
+читать актуальное состояние базы, а не полагаться на аргументы.
+
+При `settings.TASKS_EAGER` задача выполняется сразу на месте вызова:
+так работают тесты и локальная разработка.
+"""
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def is_eager():
+    return getattr(settings, 'TASKS_EAGER', False)
+
+
+def max_attempts():
+    return getattr(settings, 'TASKS_MAX_ATTEMPTS', 5)
+
+
+def retry_delay(attempts):
+    """Пауза перед следующей попыткой: удваивается с каждой ошибкой."""
+    base = getattr(settings, 'TASKS_RETRY_DELAY', 10)
+    return timedelta(seconds=base * 2 ** max(attempts - 1, 0))
+
+
+def lease():
+    return timedelta(seconds=getattr(settings, 'TASKS_LEASE', 300))
+
+
+def task(func):
+    """Регистрирует функцию как фоновую задачу."""
+    func.task_name = f'{func.__module__}.{func.__name__}'
+    _registry[func.task_name] = func
+    return func
+
+
+def enqueue(func, *args, key=None, delay=0, **kwargs):
+    """Ставит вызов `func(*args, **kwargs)` в очередь. Аргументы должны
+    сериализоваться в JSON."""
+    if is_eager():
+        with transaction.atomic():
+            func(*args, **kwargs)
+        return
+    Task.objects.bulk_create([Task(
+        name=func.task_name,
+        payload=json.dumps({'args': args, 'kwargs': kwargs}),
+        key=key,
+        max_attempts=max_attempts(),
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )], ignore_conflicts=True)
+
+
+def _runnable(now):
+    # Задача, чей воркер пропал, снова доступна после истечения аренды.
+    return (Q(status=Task.PENDING, run_at__lte=now)
+            | Q(status=Task.RUNNING, locked_until__lt=now))
+
+
+def claim(limit):
+    """Забирает до `limit` задач, готовых к запуску. Каждая задача
+    захватывается условным UPDATE, поэтому параллельные воркеры не
+    получат одну и ту же."""
+    now = timezone.now()
+    candidates = Task.objects.filter(_runnable(now)).order_by(
+        'run_at', 'pk'
+    ).values_list('pk', flat=True)[:limit]
+    claimed = [
+        pk for pk in candidates
+        if Task.objects.filter(_runnable(now), pk=pk).update(
+            status=Task.RUNNING,
+            locked_until=now + lease(),
+            attempts=F('attempts') + 1,
+        )
+    ]
+    return list(Task.objects.filter(pk__in=claimed).order_by('run_at', 'pk'))
+
+
+def _finish(item, **fields):
+    Task.objects.filter(pk=item.pk).update(
+        locked_until=None, finished=timezone.now(), **fields
+    )
+
+
+def _retry(item, error):
+    try:
+        with transaction.atomic():
+            Task.objects.filter(pk=item.pk).update(
+                status=Task.PENDING,
+                locked_until=None,
+                run_at=timezone.now() + retry_delay(item.attempts),
+                last_error=error,
+            )
+    except IntegrityError:
+        # Та же работа уже снова в очереди: её выполнит новая задача.
+        _finish(item, status=Task.DONE, last_error=error)
+
+
+def execute(item):
+    """Выполняет захваченную задачу и записывает результат."""
+    try:
+        func = _registry[item.name]
+        payload = json.loads(item.payload)
+        with transaction.atomic():
+            func(*payload['args'], **payload['kwargs'])
+    except Exception as error:
+        logger.exception('Задача %s #%s не выполнена', item.name, item.pk)
+        message = f'{type(error).__name__}: {error}'
+        if item.attempts >= item.max_attempts:
+            _finish(item, status=Task.FAILED, last_error=message)
+        else:
+            _retry(item, message)
+        return False
+    _finish(item, status=Task.DONE)
+    return True
+
+
+def run_pending(limit=100):
+    """Выполняет готовые задачи. Возвращает число запущенных."""
+    items = claim(limit)
+    for item in items:
+        execute(item)
+    return len(items)
+
+
+def purge(days):
+    """Удаляет выполненные задачи старше `days` дней."""
+    deleted, _ = Task.objects.filter(
+        status=Task.DONE,
+        finished__lt=timezone.now() - timedelta(days=days),
+    ).delete()
+    return deleted
@@ -0,0 +1,52 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+from django.template import TemplateSyntaxError, VariableDoesNotExist
+
+from core.cache import get_or_set_coalesced
+
+register = template.Library()
+
+
+class CoalescedCacheNode(template.Node):
+    def __init__(self, nodelist, timeout, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        try:
+            timeout = int(self.timeout.resolve(context))
+        except (VariableDoesNotExist, ValueError, TypeError):
+            raise TemplateSyntaxError(
+                f'"coalesced_cache" tag got a bad timeout: {self.timeout}'
+            )
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(self.fragment_name, vary_on)
+        return get_or_set_coalesced(
+            key, lambda: self.nodelist.render(context), timeout
+        )
+
+
+@register.tag
+def coalesced_cache(parser, token):
+    """Как `{% cache %}`, но при истечении фрагмента его пересчитывает
+    только один процесс, а остальные отдают прежнюю версию.
+
+        {% coalesced_cache 300 fragment_name var1 var2 %}
+            ...
+        {% endcoalesced_cache %}
+    """
+    nodelist = parser.parse(('endcoalesced_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise TemplateSyntaxError(
+            f'"{tokens[0]}" tag requires at least 2 arguments.'
+        )
+    return CoalescedCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+    )
@@ -0,0 +1,13 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page):
+    """Номера страниц для полосы под лентой: окно вокруг текущей
+    (None - пропуск), если пагинатор его умеет, иначе все номера."""
+    paginator = page.paginator
+    if hasattr(paginator, 'page_window'):
+        return paginator.page_window(page.number)
+    return paginator.page_range
@@ -0,0 +1,11 @@
+from django import template
+
+from core.reverse import cached_reverse
+
+register = template.Library()
+
+
+@register.simple_tag
+def cached_url(viewname, *args):
+    """Как `{% url %}`, но разбор URLconf выполняется один раз на имя."""
+    return cached_reverse(viewname, *args)
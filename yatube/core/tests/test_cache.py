@@ -0,0 +1,79 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from ..cache import LOCK_SUFFIX, get_or_set_coalesced
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'coalesced-cache-tests',
+    }
+})
+class CoalescedCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def producer(self, value='новое', delay=0):
+        def produce():
+            self.calls += 1
+            time.sleep(delay)
+            return value
+        return produce
+
+    def test_fresh_value_is_not_recomputed(self):
+        """Свежее значение берётся из кеша без пересчёта."""
+        get_or_set_coalesced('key', self.producer(), 60)
+        value = get_or_set_coalesced('key', self.producer(), 60)
+        self.assertEqual(value, 'новое')
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_served_while_locked(self):
+        """Пока другой процесс пересчитывает, отдаётся старое значение."""
+        cache.set('key', (time.time() - 1, 'старое'), 60)
+        cache.add('key' + LOCK_SUFFIX, True, 10)
+        value = get_or_set_coalesced('key', self.producer(), 60)
+        self.assertEqual(value, 'старое')
+        self.assertEqual(self.calls, 0)
+
+    def test_expired_value_is_recomputed_once(self):
+        """Устаревшее значение пересчитывает тот, кто взял блокировку."""
+        cache.set('key', (time.time() - 1, 'старое'), 60)
+        value = get_or_set_coalesced('key', self.producer(), 60)
+        self.assertEqual(value, 'новое')
+        self.assertIsNone(cache.get('key' + LOCK_SUFFIX))
+
+    def test_concurrent_misses_compute_once(self):
+        """Одновременные промахи пересчитывают значение один раз."""
+        results = []
+        produce = self.producer(delay=0.2)
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                get_or_set_coalesced('key', produce, 60)
+            ))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['новое'] * 8)
+        self.assertEqual(self.calls, 1)
+
+    def test_template_tag_caches_fragment(self):
+        """Тег coalesced_cache кеширует фрагмент по ключу."""
+        template = Template(
+            '{% load cache_tags %}'
+            '{% coalesced_cache 60 fragment key %}{{ text }}'
+            '{% endcoalesced_cache %}'
+        )
+        template.render(Context({'key': 1, 'text': 'первый'}))
+        cached = template.render(Context({'key': 1, 'text': 'второй'}))
+        other = template.render(Context({'key': 2, 'text': 'второй'}))
+        self.assertEqual(cached, 'первый')
+        self.assertEqual(other, 'второй')
@@ -0,0 +1,71 @@
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import skipUnless
+
+from django.db import connection, connections
+from django.test import SimpleTestCase
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Проверяются настройки SQLite')
+class SqliteConnectionTests(SimpleTestCase):
+    """Отдельные соединения с файловой базой, как у разных воркеров."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.name = str(Path(self.directory) / 'db.sqlite3')
+        self.connections = []
+
+    def tearDown(self):
+        for wrapper in self.connections:
+            wrapper.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def connect(self):
+        default = connections['default']
+        settings_dict = {**default.settings_dict, 'NAME': self.name}
+        wrapper = type(default)(settings_dict, alias='worker')
+        wrapper.ensure_connection()
+        self.connections.append(wrapper)
+        return wrapper
+
+    def fetch(self, wrapper, sql):
+        with wrapper.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        """Новое соединение работает в WAL и ждёт чужие блокировки."""
+        wrapper = self.connect()
+        self.assertEqual(self.fetch(wrapper, 'PRAGMA journal_mode'), 'wal')
+        self.assertGreater(self.fetch(wrapper, 'PRAGMA busy_timeout'), 0)
+
+    def test_writers_do_not_block_readers(self):
+        """Чтение идёт во время записи, второй писатель дожидается
+        первого вместо ошибки database is locked."""
+        writer, reader, other_writer = (
+            self.connect(), self.connect(), self.connect()
+        )
+        with writer.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+            cursor.execute('INSERT INTO item DEFAULT VALUES')
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('INSERT INTO item DEFAULT VALUES')
+
+        self.assertEqual(self.fetch(reader, 'SELECT COUNT(*) FROM item'), 1)
+
+        def commit_later():
+            time.sleep(0.2)
+            with writer.cursor() as cursor:
+                cursor.execute('COMMIT')
+
+        writer.inc_thread_sharing()
+        thread = threading.Thread(target=commit_later)
+        thread.start()
+        with other_writer.cursor() as cursor:
+            cursor.execute('INSERT INTO item DEFAULT VALUES')
+        thread.join()
+        writer.dec_thread_sharing()
+        self.assertEqual(self.fetch(reader, 'SELECT COUNT(*) FROM item'), 3)
@@ -0,0 +1,102 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, UserStats
+
+from ..middleware import STICKY_COOKIE
+
+User = get_user_model()
+
+REPLICA = 'replica_test'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTests(TransactionTestCase):
+    """Реплика - отдельный файл SQLite без репликации: всё, что видно
+    только в основной базе, на ней отсутствует."""
+
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        connections.databases[REPLICA] = {
+            **connections['default'].settings_dict,
+            'NAME': str(Path(cls.directory) / 'replica.sqlite3'),
+        }
+        call_command('migrate', database=REPLICA, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='replica_author')
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_reads_go_to_replica(self):
+        """Без куки страница читается с реплики."""
+        Post.objects.create(text='Только в основной базе', author=self.author)
+        response = Client().get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Только в основной базе')
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_author_sees_own_post_after_write(self):
+        """После записи автор читает основную базу и видит свой пост,
+        даже если аноним уже закешировал ленту, прочитанную с реплики."""
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Свежий пост'}
+        )
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertNotContains(
+            Client().get(reverse('posts:index')), 'Свежий пост'
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Свежий пост')
+        self.assertNotContains(
+            Client().get(reverse('posts:index')), 'Свежий пост'
+        )
+
+    def test_writes_go_to_primary(self):
+        self.client.post(reverse('posts:post_create'), {'text': 'Запись'})
+        self.assertTrue(Post.objects.filter(text='Запись').exists())
+        self.assertFalse(
+            Post.objects.using(REPLICA).filter(text='Запись').exists()
+        )
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'router_test_cache',
+    }})
+    def test_service_writes_keep_replica_reads(self):
+        """Кеш в базе читается с основной (на реплике его таблицы нет),
+        а запись в кеш и создание строки счётчиков на GET не включают
+        чтение с основной базы."""
+        call_command('createcachetable', verbosity=0)
+        User.objects.using(REPLICA).create(
+            pk=self.author.pk, username=self.author.username
+        )
+        UserStats.objects.filter(user=self.author).delete()
+        for url in (reverse('posts:index'),
+                    reverse('posts:profile', args=[self.author.username])):
+            with self.subTest(url=url):
+                response = Client().get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn(STICKY_COOKIE, response.cookies)
+        self.assertTrue(UserStats.objects.filter(user=self.author).exists())
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import instrumentation
+
+User = get_user_model()
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1)
+class InstrumentationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='measured')
+        Post.objects.create(text='Замеряемый пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        instrumentation.reset()
+
+    def test_server_timing_header(self):
+        response = Client().get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'cache;desc=', 'total;dur='):
+            self.assertIn(metric, timing)
+        self.assertRegex(timing, r'queries=[1-9]')
+
+    def test_stats_are_aggregated_by_url_name(self):
+        client = Client()
+        client.get(reverse('posts:index'))
+        client.get(reverse('posts:index'))
+        client.get(reverse('posts:profile', args=[self.author.username]))
+        stats = instrumentation.stats()
+        self.assertEqual(stats['posts:index']['requests'], 2)
+        self.assertEqual(stats['posts:profile']['requests'], 1)
+        self.assertGreater(stats['posts:index']['mean_queries'], 0)
+        self.assertGreater(stats['posts:index']['cache_hits'], 0)
+
+    def test_duplicate_queries_are_fingerprinted(self):
+        with instrumentation.sampling() as sample:
+            for _ in range(3):
+                list(Post.objects.filter(pk__in=[1, 2]))
+            list(Post.objects.filter(pk__in=[1, 2, 3]))
+        self.assertEqual(list(sample.duplicates.values()), [4])
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_untouched(self):
+        response = Client().get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(instrumentation.stats(), {})
+
+    def test_stats_endpoint_is_for_staff(self):
+        url = reverse('core:instrumentation_stats')
+        self.assertEqual(Client().get(url).status_code, 302)
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        client = Client()
+        client.force_login(staff)
+        client.get(reverse('posts:index'))
+        data = client.get(url).json()
+        self.assertEqual(data['views']['posts:index']['requests'], 1)
@@ -0,0 +1,21 @@
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from ..reverse import cached_reverse
+
+
+class CachedReverseTests(SimpleTestCase):
+    def test_matches_reverse(self):
+        cases = [
+            ('posts:index', ()),
+            ('posts:post_detail', (42,)),
+            ('posts:group_list', ('cats-and-dogs',)),
+            ('posts:profile', ('ivan.petrov+1@',)),
+            ('posts:profile', ('Иван',)),
+        ]
+        for viewname, args in cases:
+            with self.subTest(viewname=viewname, args=args):
+                self.assertEqual(
+                    cached_reverse(viewname, *args),
+                    reverse(viewname, args=args),
+                )
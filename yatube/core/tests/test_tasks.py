@@ -0,0 +1,95 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+from posts.models import Follow, Post, TimelineEntry
+from posts.search import ranked
+
+User = get_user_model()
+
+calls = []
+
+
+@tasks.task
+def remember(value):
+    calls.append(value)
+
+
+@tasks.task
+def explode():
+    raise RuntimeError('сломалось')
+
+
+@override_settings(TASKS_EAGER=False)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        """Задача ждёт воркера и выполняется им один раз."""
+        tasks.enqueue(remember, 1)
+        self.assertEqual(calls, [])
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertEqual(calls, [1])
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+        self.assertEqual(tasks.run_pending(), 0)
+
+    def test_pending_tasks_with_same_key_collapse(self):
+        tasks.enqueue(remember, 1, key='same')
+        tasks.enqueue(remember, 2, key='same')
+        tasks.run_pending()
+        self.assertEqual(calls, [1])
+        tasks.enqueue(remember, 3, key='same')
+        tasks.run_pending()
+        self.assertEqual(calls, [1, 3])
+
+    def test_delay(self):
+        tasks.enqueue(remember, 1, delay=60)
+        self.assertEqual(tasks.run_pending(), 0)
+
+    @override_settings(TASKS_MAX_ATTEMPTS=2)
+    def test_retries_then_fails(self):
+        """Ошибка откладывает задачу, после последней попытки - failed."""
+        tasks.enqueue(explode)
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.run_pending()
+        item = Task.objects.get()
+        self.assertEqual(item.status, Task.PENDING)
+        self.assertIn('сломалось', item.last_error)
+        self.assertGreater(item.run_at, timezone.now())
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.run_pending()
+        item.refresh_from_db()
+        self.assertEqual((item.status, item.attempts), (Task.FAILED, 2))
+
+    def test_abandoned_task_is_reclaimed(self):
+        """Задачу упавшего воркера забирают после истечения аренды."""
+        tasks.enqueue(remember, 1)
+        Task.objects.update(
+            status=Task.RUNNING,
+            locked_until=timezone.now() - timedelta(seconds=1),
+        )
+        tasks.run_pending()
+        self.assertEqual(calls, [1])
+
+    def test_post_side_effects_wait_for_worker(self):
+        """Индексация и раскладка по лентам идут через очередь."""
+        author = User.objects.create_user(username='queued_author')
+        reader = User.objects.create_user(username='queued_reader')
+        Follow.objects.create(user=reader, author=author)
+        post = Post.objects.create(text='Жирафы спят стоя', author=author)
+        self.assertFalse(ranked('жираф').exists())
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        call_command('run_worker', '--once', stdout=StringIO())
+        self.assertEqual([row['post_id'] for row in ranked('жираф')],
+                         [post.pk])
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=reader, post=post).exists()
+        )
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    # Сводка замеров запросов для персонала
+    path('stats/', views.instrumentation_stats,
+         name='instrumentation_stats'),
+]
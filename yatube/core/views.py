@@ -1,13 +1,24 @@
 from http import HTTPStatus
 
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import instrumentation
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
 
 
 def csrf_failure(request, reason=''):
+    """Клиентам API - ошибка в JSON, как остальные ответы API."""
+    match = getattr(request, 'resolver_match', None)
+    if match is not None and match.namespace == 'api':
+        return JsonResponse(
+            {'detail': 'Ошибка проверки CSRF-токена'},
+            status=HTTPStatus.FORBIDDEN,
+        )
     return render(request, 'core/403csrf.html')
 
 
@@ -21,3 +32,15 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=HTTPStatus.FORBIDDEN)
+
+
+@staff_member_required
+def instrumentation_stats(request):
+    """Сводка замеров запросов этого процесса; `?reset=1` обнуляет её."""
+    data = instrumentation.stats()
+    if request.GET.get('reset'):
+        instrumentation.reset()
+    return JsonResponse({
+        'sample_rate': instrumentation.sample_rate(),
+        'views': data,
+    })
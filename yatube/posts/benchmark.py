@@ -0,0 +1,280 @@
+"""Нагрузочные замеры публичных страниц.
+
+`seed` заполняет базу синтетическими данными (mixer + Faker), `run`
+прогоняет страницы через тестовый клиент и для каждой считает
+перцентили времени ответа, число SQL-запросов и размер ответа.
+`render_pages` отдельно замеряет рендеринг шаблона ленты с 10, 50
+и 100 постами, без базы и кеша фрагментов.
+Результат - словарь, который команда `benchmark` пишет в JSON, чтобы
+сравнивать замеры между коммитами.
+"""
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from copy import deepcopy
+from statistics import mean
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import (
+    CaptureQueriesContext, setup_test_environment, teardown_test_environment,
+)
+from django.urls import reverse
+from faker import Faker
+from mixer.backend.django import mixer
+
+from .models import Comment, Follow, Group, Post, User
+from .paginators import CursorPaginator
+from .queries import index_feed
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+DATASET = {
+    'users': 50,
+    'groups': 5,
+    'posts': 500,
+    'comments': 1000,
+    'follows': 10,
+    'image_ratio': 0.1,
+}
+
+PERCENTILES = (50, 95, 99)
+RENDER_SIZES = (10, 50, 100)
+
+
+def isolated_caches():
+    """Те же бэкенды кеша, но с уникальным префиксом ключей прогона."""
+    caches = deepcopy(settings.CACHES)
+    prefix = f'benchmark-{uuid.uuid4().hex[:8]}'
+    for options in caches.values():
+        options['KEY_PREFIX'] = f"{prefix}:{options.get('KEY_PREFIX', '')}"
+    return caches
+
+
+@contextmanager
+def sandbox(**overrides):
+    """Временная тестовая база и каталог медиа на время замеров."""
+    media_root = tempfile.mkdtemp()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        options = {
+            'MEDIA_ROOT': media_root,
+            'CACHES': isolated_caches(),
+            'TASKS_EAGER': True,
+        }
+        options.update(overrides)
+        with override_settings(**options):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+class Dataset:
+    """Объекты, по которым строятся адреса замеряемых страниц."""
+
+    def __init__(self, reader, author, group, post):
+        self.reader = reader
+        self.author = author
+        self.group = group
+        self.post = post
+
+
+def seed(users, groups, posts, comments, follows, image_ratio, seed=0):
+    """Создаёт данные через модели, чтобы сигналы заполнили счётчики,
+    ленты подписок и поисковый индекс."""
+    rnd = random.Random(seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed)
+    people = [
+        mixer.blend(
+            User, username=f'bench_{i}',
+            first_name=fake.first_name(), last_name=fake.last_name(),
+        )
+        for i in range(users)
+    ]
+    group_list = [
+        mixer.blend(Group, slug=f'bench-group-{i}', title=fake.word())
+        for i in range(groups)
+    ]
+    for user in people:
+        authors = rnd.sample(people, min(follows, len(people)))
+        for author in authors:
+            if author != user:
+                Follow.objects.create(user=user, author=author)
+    post_list = []
+    for _ in range(posts):
+        image = None
+        if rnd.random() < image_ratio:
+            image = SimpleUploadedFile(
+                'bench.gif', SMALL_GIF, content_type='image/gif'
+            )
+        post_list.append(mixer.blend(
+            Post,
+            text=fake.text(max_nb_chars=400),
+            author=rnd.choice(people),
+            group=rnd.choice(group_list + [None]) if group_list else None,
+            image=image,
+        ))
+    for _ in range(comments):
+        mixer.blend(
+            Comment,
+            post=rnd.choice(post_list),
+            author=rnd.choice(people),
+            text=fake.sentence(),
+        )
+    author = max(people, key=lambda user: user.posts.count())
+    post = max(post_list, key=lambda post: post.comments.count())
+    group = max(group_list, key=lambda group: group.posts.count())
+    return Dataset(people[0], author, group, post)
+
+
+def scenarios(dataset):
+    """(имя, метод, адрес, данные POST) для каждой страницы."""
+    post_id = dataset.post.pk
+    return [
+        ('index', 'get', reverse('posts:index'), None),
+        ('group_posts', 'get',
+         reverse('posts:group_list', args=[dataset.group.slug]), None),
+        ('profile', 'get',
+         reverse('posts:profile', args=[dataset.author.username]), None),
+        ('post_detail', 'get',
+         reverse('posts:post_detail', args=[post_id]), None),
+        ('follow_index', 'get', reverse('posts:follow_index'), None),
+        ('post_create', 'post', reverse('posts:post_create'),
+         {'text': 'Замер создания поста'}),
+        ('add_comment', 'post',
+         reverse('posts:add_comment', args=[post_id]),
+         {'text': 'Замер комментария'}),
+    ]
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    rank = max(1, round(percent / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def measure(client, method, url, data):
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = getattr(client, method)(url, data)
+        elapsed = time.perf_counter() - started
+    return elapsed * 1000, len(queries), len(response.content), response
+
+
+def summarize(timings, queries, sizes, statuses):
+    result = {
+        f'p{percent}_ms': round(percentile(timings, percent), 3)
+        for percent in PERCENTILES
+    }
+    result.update({
+        'mean_ms': round(mean(timings), 3),
+        'queries': {'min': min(queries), 'max': max(queries),
+                    'mean': round(mean(queries), 2)},
+        'bytes': {'min': min(sizes), 'max': max(sizes),
+                  'mean': round(mean(sizes))},
+        'statuses': sorted(set(statuses)),
+    })
+    return result
+
+
+def run(dataset, iterations=50, warmup=5, only=None, cold=False):
+    """Замеры страниц `only` (по умолчанию всех).
+
+    `cold` очищает кеш перед каждым запросом.
+    """
+    client = Client()
+    client.force_login(dataset.reader)
+    results = {}
+    for name, method, url, data in scenarios(dataset):
+        if only and name not in only:
+            continue
+        for _ in range(warmup):
+            measure(client, method, url, data)
+        timings, queries, sizes, statuses = [], [], [], []
+        for _ in range(iterations):
+            if cold:
+                cache.clear()
+            elapsed, count, size, response = measure(
+                client, method, url, data
+            )
+            timings.append(elapsed)
+            queries.append(count)
+            sizes.append(size)
+            statuses.append(response.status_code)
+        results[name] = summarize(timings, queries, sizes, statuses)
+    return results
+
+
+def compare(baseline, current):
+    """Относительное изменение p95 и числа запросов против `baseline`."""
+    changes = {}
+    for name, result in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        changes[name] = {
+            'p95_change': round(
+                result['p95_ms'] / before['p95_ms'] - 1, 3
+            ) if before['p95_ms'] else None,
+            'queries_change': (
+                result['queries']['max'] - before['queries']['max']
+            ),
+        }
+    return changes
+
+
+class UncachedFragment:
+    """Параметры `{% coalesced_cache %}` с новым ключом на каждый
+    рендеринг: фрагмент ленты всегда рисуется заново."""
+
+    timeout = 0
+
+    @property
+    def key(self):
+        return uuid.uuid4().hex
+
+
+def render_pages(sizes=RENDER_SIZES, iterations=50, warmup=5):
+    """Время рендеринга `posts/index.html` со страницей из `size`
+    постов. Посты читаются заранее, поэтому замер не включает SQL."""
+    request = RequestFactory().get(reverse('posts:index'))
+    request.user = AnonymousUser()
+    results = {}
+    for size in sizes:
+        page = CursorPaginator(index_feed(), size).get_cursor_page()
+        context = {'page_obj': page, 'feed_cache': UncachedFragment()}
+        for _ in range(warmup):
+            render_to_string('posts/index.html', context, request)
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            render_to_string('posts/index.html', context, request)
+            timings.append((time.perf_counter() - started) * 1000)
+        result = {
+            f'p{percent}_ms': round(percentile(timings, percent), 3)
+            for percent in PERCENTILES
+        }
+        result['mean_ms'] = round(mean(timings), 3)
+        result['posts'] = len(page.object_list)
+        results[size] = result
+    return results
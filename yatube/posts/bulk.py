@@ -0,0 +1,411 @@
+"""Массовая выгрузка и загрузка постов, комментариев и подписок.
+
+Строки читаются и пишутся потоком в JSON Lines или CSV, поэтому память
+не зависит от размера файла. Загрузка идёт пачками через bulk_create,
+каждая пачка - в своей транзакции; после пачки число обработанных
+строк записывается в файл контрольной точки, и прерванную загрузку
+можно продолжить. bulk_create не вызывает сигналы, поэтому поисковый
+индекс пополняется по пачкам, а счётчики и ленты подписок
+пересчитываются в конце (`finish`).
+
+Строки, id которых уже заняты в базе, не перезаписывают существующие
+посты и комментарии: они считаются конфликтами и попадают в отчёт.
+После загрузки `finish` сдвигает последовательности id за максимальный
+загруженный, иначе следующий обычный пост получил бы занятый id.
+
+Пользователи и группы в файлах записаны по username и slug, посты
+и комментарии сохраняют свои id: на них ссылаются комментарии.
+"""
+import csv
+import json
+import os
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters, feed_cache, follow_graph, markup, search, timeline
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+FORMATS = ('jsonl', 'csv')
+
+
+def guess_format(path):
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    return 'jsonl' if extension in ('json', 'jsonl', 'ndjson') else extension
+
+
+class Stats:
+    """Счётчики прогона и пропускная способность."""
+
+    def __init__(self, records=0):
+        self.records = records
+        self.skipped = 0
+        self.conflicts = 0
+        self.processed = 0
+        self.started = time.monotonic()
+
+    @property
+    def seconds(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        return self.processed / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f'строк {self.records}, пропущено {self.skipped}, '
+                f'конфликтов id {self.conflicts}, {self.rate:.0f} строк/с')
+
+
+class Lookup:
+    """Id пользователей и групп по username и slug для одной пачки."""
+
+    def __init__(self, create_missing=False):
+        self.create_missing = create_missing
+
+    def users(self, usernames):
+        usernames = set(filter(None, usernames))
+        found = dict(User.objects.filter(
+            username__in=usernames
+        ).values_list('username', 'pk'))
+        missing = usernames - set(found)
+        if missing and self.create_missing:
+            User.objects.bulk_create(
+                User(username=name, password=make_password(None))
+                for name in missing
+            )
+            return self.users(usernames)
+        return found
+
+    def groups(self, slugs):
+        slugs = set(filter(None, slugs))
+        found = dict(Group.objects.filter(
+            slug__in=slugs
+        ).values_list('slug', 'pk'))
+        missing = slugs - set(found)
+        if missing and self.create_missing:
+            Group.objects.bulk_create(
+                Group(slug=slug, title=slug, description='')
+                for slug in missing
+            )
+            return self.groups(slugs)
+        return found
+
+
+def _date(value):
+    return parse_datetime(value) if value else timezone.now()
+
+
+def _rendered(objects):
+    """bulk_create обходит save(): HTML текстов считаем здесь, с одним
+    запросом упоминаний на пачку."""
+    users = markup.known_users(obj.text for obj in objects)
+    for obj in objects:
+        obj.render_text(users)
+    return objects
+
+
+class BadRecord(ValueError):
+    """Строку файла нельзя загрузить: битый JSON, нет обязательной
+    колонки или id - не число. Загрузка останавливается на ней, и после
+    исправления файла продолжается с контрольной точки."""
+
+    def __init__(self, line, reason):
+        super().__init__(f'Строка {line}: {reason}')
+        self.line = line
+
+
+class Kind:
+    """Формат строк одной модели: поля файла и сборка объектов."""
+
+    model = None
+    fields = ()
+    columns = ()
+    # Колонки, без которых строку не собрать, и колонки с целыми id.
+    required = ()
+    integer_fields = ()
+    date_field = None
+    # Сохраняет ли файл id строк; тогда занятые id - конфликты.
+    keeps_ids = False
+
+    def queryset(self):
+        return self.model.objects.order_by('pk').values_list(*self.columns)
+
+    def to_record(self, values):
+        record = dict(zip(self.fields, values))
+        if self.date_field:
+            record[self.date_field] = record[self.date_field].isoformat()
+        return record
+
+    def clean(self, record, line):
+        """Запись с проверенными колонками и id, приведёнными к int."""
+        if not isinstance(record, dict):
+            raise BadRecord(line, 'ожидается объект с колонками')
+        missing = [
+            field for field in self.required if record.get(field) in (None, '')
+        ]
+        if missing:
+            raise BadRecord(line, f'нет колонок {", ".join(missing)}')
+        record = {field: record.get(field) for field in self.fields}
+        for field in self.integer_fields:
+            try:
+                record[field] = int(record[field])
+            except (TypeError, ValueError):
+                raise BadRecord(line, f'{field} - не целое число')
+        return record
+
+    def build(self, records, lookup):
+        """Объекты для bulk_create; строки без связанных объектов
+        отбрасываются."""
+        raise NotImplementedError
+
+    def conflicts(self, objects):
+        """Объекты, чьи id уже заняты в базе."""
+        if not self.keeps_ids:
+            return set()
+        return set(self.model.objects.filter(
+            pk__in=[obj.pk for obj in objects]
+        ).values_list('pk', flat=True))
+
+    def index(self, objects):
+        pass
+
+
+class PostKind(Kind):
+    model = Post
+    fields = ('id', 'author', 'group', 'text', 'pub_date', 'image')
+    columns = ('pk', 'author__username', 'group__slug', 'text',
+               'pub_date', 'image')
+    required = ('id', 'author', 'text')
+    integer_fields = ('id',)
+    date_field = 'pub_date'
+    keeps_ids = True
+
+    def build(self, records, lookup):
+        users = lookup.users(record['author'] for record in records)
+        groups = lookup.groups(record['group'] for record in records)
+        return _rendered([
+            Post(
+                pk=record['id'],
+                author_id=users[record['author']],
+                group_id=groups.get(record['group']),
+                text=record['text'],
+                pub_date=_date(record['pub_date']),
+                image=record['image'] or '',
+            )
+            for record in records if record['author'] in users
+        ])
+
+    def index(self, objects):
+        search.index_documents((post.pk, post.text) for post in objects)
+
+
+class CommentKind(Kind):
+    model = Comment
+    fields = ('id', 'post', 'author', 'text', 'created')
+    columns = ('pk', 'post_id', 'author__username', 'text', 'created')
+    required = ('id', 'post', 'author', 'text')
+    integer_fields = ('id', 'post')
+    date_field = 'created'
+    keeps_ids = True
+
+    def build(self, records, lookup):
+        users = lookup.users(record['author'] for record in records)
+        posts = set(Post.objects.filter(
+            pk__in=[record['post'] for record in records]
+        ).values_list('pk', flat=True))
+        return _rendered([
+            Comment(
+                pk=record['id'],
+                post_id=record['post'],
+                author_id=users[record['author']],
+                text=record['text'],
+                created=_date(record['created']),
+            )
+            for record in records
+            if record['author'] in users and record['post'] in posts
+        ])
+
+    def index(self, objects):
+        search.index_documents(
+            (comment.post_id, comment.text, comment.pk)
+            for comment in objects
+        )
+
+
+class FollowKind(Kind):
+    model = Follow
+    fields = ('user', 'author')
+    columns = ('user__username', 'author__username')
+    required = ('user', 'author')
+
+    def build(self, records, lookup):
+        users = lookup.users(
+            name for record in records
+            for name in (record['user'], record['author'])
+        )
+        # На себя подписаться нельзя, как и через страницу профиля.
+        return [
+            Follow(user_id=users[record['user']],
+                   author_id=users[record['author']])
+            for record in records
+            if record['user'] in users and record['author'] in users
+            and record['user'] != record['author']
+        ]
+
+
+KINDS = {
+    'posts': PostKind(),
+    'comments': CommentKind(),
+    'follows': FollowKind(),
+}
+
+
+@contextmanager
+def keep_dates(model):
+    """Не даёт auto_now_add заменить даты из файла текущим временем."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def write_records(file, fmt, fields, records):
+    if fmt == 'csv':
+        writer = csv.DictWriter(file, fieldnames=fields)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            yield
+        return
+    for record in records:
+        file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        yield
+
+
+def read_records(file, fmt, skip=0):
+    """Пары (номер строки файла, запись) после первых `skip` записей.
+    Пустая строка JSON Lines считается записью, чтобы номер
+    в контрольной точке совпадал с номером строки."""
+    if fmt == 'csv':
+        # Первая строка CSV - заголовок.
+        records = islice(csv.DictReader(file), skip, None)
+        yield from enumerate(records, start=skip + 2)
+        return
+    for number, line in enumerate(islice(file, skip, None), start=skip + 1):
+        if not line.strip():
+            yield number, None
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            raise BadRecord(number, 'некорректный JSON')
+
+
+def export_file(kind, path, fmt, chunk_size=BATCH_SIZE, progress=None):
+    kind = KINDS[kind]
+    stats = Stats()
+    rows = kind.queryset().iterator(chunk_size=chunk_size)
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        records = (kind.to_record(values) for values in rows)
+        for _ in write_records(file, fmt, kind.fields, records):
+            stats.records += 1
+            stats.processed += 1
+            if progress and stats.records % chunk_size == 0:
+                progress(stats)
+    return stats
+
+
+def checkpoint_path(path):
+    return f'{path}.checkpoint'
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)['records']
+    except (OSError, ValueError, KeyError):
+        return 0
+
+
+def save_checkpoint(path, records):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump({'records': records}, file)
+    os.replace(temporary, path)
+
+
+def import_file(kind, path, fmt, batch_size=BATCH_SIZE,
+                create_missing=False, resume=True, progress=None):
+    """Загружает файл пачками, продолжая с контрольной точки."""
+    kind = KINDS[kind]
+    checkpoint = checkpoint_path(path)
+    stats = Stats(load_checkpoint(checkpoint) if resume else 0)
+    lookup = Lookup(create_missing)
+    with open(path, newline='', encoding='utf-8') as file:
+        records = read_records(file, fmt, skip=stats.records)
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            rows = [
+                kind.clean(record, number)
+                for number, record in batch if record is not None
+            ]
+            with transaction.atomic(), keep_dates(kind.model):
+                built = kind.build(rows, lookup)
+                taken = kind.conflicts(built)
+                objects = [obj for obj in built if obj.pk not in taken]
+                kind.model.objects.bulk_create(objects,
+                                               ignore_conflicts=True)
+                kind.index(objects)
+            stats.records += len(batch)
+            stats.processed += len(batch)
+            stats.skipped += len(rows) - len(built)
+            stats.conflicts += len(taken)
+            save_checkpoint(checkpoint, stats.records)
+            if progress:
+                progress(stats)
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return stats
+
+
+def reset_sequences(kinds):
+    """Сдвигает последовательности id за максимальный id в таблице:
+    bulk_create с явными id их не трогает."""
+    models = [KINDS[kind].model for kind in kinds if KINDS[kind].keeps_ids]
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if not statements:
+        return
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def finish(kinds):
+    """Пересчитывает то, что при обычной записи делают сигналы."""
+    reset_sequences(kinds)
+    counters.reconcile()
+    if {'posts', 'follows'} & set(kinds):
+        timeline.rebuild()
+    if 'follows' in kinds:
+        follow_graph.invalidate_all()
+    feed_cache.bump('users', 'posts')
@@ -0,0 +1,129 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются одним UPDATE с F-выражением из обработчиков сигналов,
+поэтому попадают в транзакцию, в которой создаётся или удаляется
+запись. `reconcile()` пересчитывает их с нуля и исправляет дрейф.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+
+def _bump(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gt': 0})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def bump_user(user_id, field, delta):
+    """Меняет счётчик пользователя, заводя строку UserStats при первой
+    необходимости. Уменьшение строку не заводит: при каскадном удалении
+    пользователя его UserStats удаляется раньше постов и подписок, и новая
+    строка помешала бы удалить саму запись пользователя. Без строки
+    `user_stats()` посчитает счётчики с нуля при первом обращении."""
+    if _bump(UserStats.objects.filter(user_id=user_id), field, delta):
+        return
+    if delta > 0 and User.objects.filter(pk=user_id).exists():
+        compute_user_stats(user_id).save()
+
+
+def bump_group(group_id, delta):
+    if group_id is not None:
+        _bump(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def bump_post(post_id, delta):
+    _bump(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def compute_user_stats(user_id):
+    """Считает счётчики пользователя по таблицам (медленный путь)."""
+    return UserStats(
+        user_id=user_id,
+        posts_count=Post.objects.filter(author_id=user_id).count(),
+        followers_count=Follow.objects.filter(author_id=user_id).count(),
+        following_count=Follow.objects.filter(user_id=user_id).count(),
+    )
+
+
+def user_stats(user):
+    """Счётчики пользователя; строка создаётся при первом обращении.
+    Пользователь мог быть прочитан с отстающей реплики, поэтому строка
+    ищется ещё раз в основной базе (get_or_create читает её)."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        computed = compute_user_stats(user.pk)
+        stats, _ = UserStats.objects.get_or_create(
+            user_id=user.pk,
+            defaults={
+                field: getattr(computed, field)
+                for field in ('posts_count', 'followers_count',
+                              'following_count')
+            },
+        )
+        user.stats = stats
+        return stats
+
+
+def _count(model, field, outer='pk'):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef(outer)}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def _reconcile_model(queryset, expected):
+    """Исправляет строки, в которых счётчики разошлись с реальностью."""
+    fields = list(expected)
+    annotations = {f'real_{name}': value for name, value in expected.items()}
+    fixed, total = [], 0
+    rows = queryset.annotate(**annotations).only('pk', *fields).order_by('pk')
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        drifted = False
+        for name in fields:
+            real = getattr(row, f'real_{name}')
+            if getattr(row, name) != real:
+                setattr(row, name, real)
+                drifted = True
+        if drifted:
+            fixed.append(row)
+        if len(fixed) == BATCH_SIZE:
+            queryset.model.objects.bulk_update(fixed, fields)
+            total += len(fixed)
+            fixed = []
+    queryset.model.objects.bulk_update(fixed, fields)
+    return total + len(fixed)
+
+
+def reconcile():
+    """Пересчитывает все счётчики. Возвращает число исправленных строк
+    по каждой таблице."""
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True
+    )
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk) for pk in missing.iterator()),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    return {
+        'users': _reconcile_model(UserStats.objects.all(), {
+            'posts_count': _count(Post, 'author', 'user_id'),
+            'followers_count': _count(Follow, 'author', 'user_id'),
+            'following_count': _count(Follow, 'user', 'user_id'),
+        }),
+        'groups': _reconcile_model(Group.objects.all(), {
+            'posts_count': _count(Post, 'group'),
+        }),
+        'posts': _reconcile_model(Post.objects.all(), {
+            'comments_count': _count(Comment, 'post'),
+        }),
+    }
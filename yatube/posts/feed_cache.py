@@ -0,0 +1,110 @@
+"""Кеширование фрагментов лент с инвалидацией по поколениям.
+
+Ключ фрагмента содержит курсор или номер страницы, размер страницы,
+источник чтения (реплика или основная база) и поколения всех областей,
+от которых зависит лента: `users`, `posts`, `post:<id>`, `group:<id>`,
+`author:<id>`, `timeline:<id>`. Запись поста, комментария или подписки
+сдвигает поколение своей области, и старые фрагменты просто перестают
+читаться, поэтому TTL может быть долгим.
+
+Поколение - это время последнего изменения области в миллисекундах,
+поэтому по нему же строится заголовок Last-Modified.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core import db_router
+
+from .paginators import CURSOR_PARAM, LIMIT_PARAM, PAGE_PARAM
+
+GENERATION_KEY = 'feed-generation:{}'
+
+
+def timeout():
+    return getattr(settings, 'FEED_CACHE_TIMEOUT', 300)
+
+
+def _now():
+    return int(time.time() * 1000)
+
+
+def generations(scopes):
+    keys = [GENERATION_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # После вытеснения ключа поколение не совпадёт со старым.
+            now = _now()
+            cache.add(key, now, None)
+            # Кеш, который ничего не хранит (DummyCache), вернёт None.
+            found[key] = cache.get(key, now)
+    return [found[key] for key in keys]
+
+
+def _advance(keys):
+    current = cache.get_many(keys)
+    now = _now()
+    cache.set_many({
+        key: max(now, current.get(key, 0) + 1) for key in keys
+    }, None)
+
+
+def bump(*scopes):
+    """Делает устаревшими все фрагменты, зависящие от областей: сразу,
+    чтобы сама транзакция не читала прежние фрагменты, и ещё раз после
+    коммита. Пока транзакция открыта, параллельный запрос видит новое
+    поколение, но старые строки, и кладёт под новым ключом прежнюю
+    страницу; второй сдвиг делает этот ключ недостижимым."""
+    keys = [GENERATION_KEY.format(scope) for scope in scopes]
+    _advance(keys)
+    transaction.on_commit(lambda: _advance(keys))
+
+
+def bump_post(post):
+    bump(
+        'posts',
+        f'post:{post.pk}',
+        f'author:{post.author_id}',
+        f'group:{post.group_id}',
+    )
+
+
+class FeedCache:
+    """Параметры тега `{% coalesced_cache %}` для ленты в шаблоне."""
+
+    def __init__(self, request, *scopes, per_viewer=False):
+        # Имена авторов выводятся во всех лентах.
+        scopes = ('users',) + scopes
+        parts = [
+            f'{scope}={generation}'
+            for scope, generation in zip(scopes, generations(scopes))
+        ]
+        parts.append(f'cursor={request.GET.get(CURSOR_PARAM, "")}')
+        parts.append(f'page={request.GET.get(PAGE_PARAM, "")}')
+        parts.append(f'limit={request.GET.get(LIMIT_PARAM, "")}')
+        parts.append(f'db={db_router.read_source()}')
+        if per_viewer:
+            parts.append(f'viewer={request.user.pk}')
+        self.key = '|'.join(parts)
+        self.timeout = timeout()
+
+
+def index_cache(request):
+    return FeedCache(request, 'posts')
+
+
+def group_cache(request, group):
+    return FeedCache(request, f'group:{group.pk}')
+
+
+def profile_cache(request, author):
+    return FeedCache(request, f'author:{author.pk}')
+
+
+def follow_cache(request):
+    return FeedCache(
+        request, 'posts', f'timeline:{request.user.pk}', per_viewer=True
+    )
@@ -0,0 +1,165 @@
+"""RSS и Atom для общей ленты, групп и авторов.
+
+Готовый XML хранится в кеше под ключом с поколениями областей
+`feed_cache`, поэтому запись поста делает его устаревшим без явной
+очистки, а пересчитывает его один процесс (`get_or_set_coalesced`).
+ETag и Last-Modified строятся так же, как у HTML-лент, и опрашивающий
+клиент без изменений получает 304 Not Modified, не трогая кеш XML.
+"""
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.defaultfilters import truncatechars
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed
+
+from core.cache import get_or_set_coalesced
+
+from .feed_cache import FeedCache
+from .http_cache import (
+    author_scopes, etags_enabled, group_scopes, index_scopes,
+    patch_caching_headers, validators,
+)
+from .models import Group, User
+from .queries import group_feed, index_feed, profile_feed
+
+
+def items_count():
+    return getattr(settings, 'SYNDICATION_ITEMS', 20)
+
+
+class LatestPostsFeed(Feed):
+    """Последние посты всего сайта."""
+
+    def title(self, obj):
+        return 'Yatube: последние обновления'
+
+    def link(self, obj):
+        return reverse('posts:index')
+
+    def description(self, obj):
+        return 'Новые записи всех авторов'
+
+    def posts(self, obj):
+        return index_feed()
+
+    def items(self, obj):
+        return self.posts(obj).order_by('-pub_date', '-pk')[:items_count()]
+
+    def item_title(self, item):
+        return truncatechars(item.text, 50)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=[item.pk])
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_categories(self, item):
+        return [item.group.title] if item.group_id else []
+
+
+class GroupPostsFeed(LatestPostsFeed):
+    """Последние посты группы."""
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def link(self, obj):
+        return reverse('posts:group_list', args=[obj.slug])
+
+    def description(self, obj):
+        return obj.description
+
+    def posts(self, obj):
+        return group_feed(obj)
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    """Последние посты автора."""
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: {obj.get_full_name() or obj.username}'
+
+    def link(self, obj):
+        return reverse('posts:profile', args=[obj.username])
+
+    def description(self, obj):
+        return f'Записи пользователя {obj.username}'
+
+    def posts(self, obj):
+        return profile_feed(obj)
+
+
+class AtomMixin:
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+class LatestPostsAtomFeed(AtomMixin, LatestPostsFeed):
+    pass
+
+
+class GroupPostsAtomFeed(AtomMixin, GroupPostsFeed):
+    pass
+
+
+class AuthorPostsAtomFeed(AtomMixin, AuthorPostsFeed):
+    pass
+
+
+def cached_feed(feed, scopes_for):
+    """View ленты `feed`, отдающий XML из кеша и 304 по ETag."""
+    def render(request, scopes, **kwargs):
+        fragment = FeedCache(request, *scopes)
+
+        def produce():
+            rendered = feed(request, **kwargs)
+            return rendered.content, rendered['Content-Type']
+
+        # В XML абсолютные ссылки: схема и хост входят в ключ.
+        content, content_type = get_or_set_coalesced(
+            f'syndication:{request.scheme}://{request.get_host()}'
+            f'{request.path}|{fragment.key}',
+            produce, fragment.timeout,
+        )
+        return HttpResponse(content, content_type=content_type)
+
+    def view(request, **kwargs):
+        scopes = scopes_for(request, **kwargs)
+        if scopes is None:
+            raise Http404
+        if not etags_enabled():
+            return render(request, scopes, **kwargs)
+        etag, last_modified = validators(request, scopes)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified.timestamp()
+        )
+        if response is None:
+            response = render(request, scopes, **kwargs)
+        return patch_caching_headers(request, response, etag, last_modified)
+    return view
+
+
+index_rss = cached_feed(LatestPostsFeed(), index_scopes)
+index_atom = cached_feed(LatestPostsAtomFeed(), index_scopes)
+group_rss = cached_feed(GroupPostsFeed(), group_scopes)
+group_atom = cached_feed(GroupPostsAtomFeed(), group_scopes)
+profile_rss = cached_feed(AuthorPostsFeed(), author_scopes)
+profile_atom = cached_feed(AuthorPostsAtomFeed(), author_scopes)
@@ -0,0 +1,231 @@
+"""Граф подписок в кеше.
+
+Для каждого пользователя в кеше лежат id авторов, на которых он
+подписан, и id его подписчиков: отсортированный массив 64-битных чисел
+(`array('q')`), сохранённый байтами. Проверка «A подписан на B» - это
+двоичный поиск в массиве A без запроса к базе; промах кеша читает
+списки сразу для всех нужных пользователей одним запросом. Подписка
+и отписка удаляют массивы обоих участников, поэтому TTL может быть
+долгим. Списки длиннее FOLLOW_GRAPH_MAX_IDS не кешируются: вместо них
+в кеше лежит метка `TOO_LONG`, и проверка подписки для такого
+пользователя - один запрос `.exists()`, а не чтение всего списка.
+
+«Вам могут понравиться» - авторы, на которых подписаны авторы
+пользователя (друзья друзей), по числу таких общих связей. Рекомендации
+считает пакетная задача `refresh_suggestions` (команда
+`refresh_follow_suggestions`, запускается по расписанию), страницы
+только читают готовый список из кеша.
+"""
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import feed_cache
+from .models import Follow, User
+
+FOLLOWING = 'following'
+FOLLOWERS = 'followers'
+# Направление -> (поле, по которому ищем, поле со списком id).
+DIRECTIONS = {
+    FOLLOWING: ('user_id', 'author_id'),
+    FOLLOWERS: ('author_id', 'user_id'),
+}
+KEY = 'follow-graph:{}:{}'
+SUGGESTIONS_KEY = 'follow-graph:suggested:{}'
+TYPECODE = 'q'
+# Массив не поместился в FOLLOW_GRAPH_MAX_IDS.
+TOO_LONG = 'too-long'
+BATCH_SIZE = 500
+
+
+def _pack(ids):
+    return array(TYPECODE, ids).tobytes()
+
+
+def _unpack(raw):
+    ids = array(TYPECODE)
+    ids.frombytes(raw)
+    return ids
+
+
+def _load(direction, user_ids):
+    """Массивы id для `user_ids` из кеша; промахи - одним запросом."""
+    user_ids = set(user_ids)
+    keys = {KEY.format(direction, user_id): user_id for user_id in user_ids}
+    found = cache.get_many(keys)
+    result = {
+        keys[key]: _unpack(raw) for key, raw in found.items()
+        if raw != TOO_LONG
+    }
+    missing = user_ids - result.keys()
+    if not missing:
+        return result
+    field, other = DIRECTIONS[direction]
+    loaded = defaultdict(list)
+    rows = Follow.objects.filter(**{f'{field}__in': missing}).order_by(
+        field, other
+    ).values_list(field, other)
+    for user_id, other_id in rows.iterator():
+        loaded[user_id].append(other_id)
+    limit = settings.FOLLOW_GRAPH_MAX_IDS
+    to_cache = {}
+    for user_id in missing:
+        ids = array(TYPECODE, loaded.get(user_id, ()))
+        result[user_id] = ids
+        to_cache[KEY.format(direction, user_id)] = (
+            ids.tobytes() if len(ids) <= limit else TOO_LONG
+        )
+    cache.set_many(to_cache, settings.FOLLOW_GRAPH_TIMEOUT)
+    return result
+
+
+def following(user_id):
+    """Отсортированные id авторов, на которых подписан пользователь."""
+    return _load(FOLLOWING, [user_id])[user_id]
+
+
+def followers(user_id):
+    """Отсортированные id подписчиков пользователя."""
+    return _load(FOLLOWERS, [user_id])[user_id]
+
+
+def contains(ids, value):
+    position = bisect_left(ids, value)
+    return position < len(ids) and ids[position] == value
+
+
+def is_following(user_id, author_id):
+    """Подписан ли `user_id` на `author_id`: двоичный поиск в массиве.
+    При промахе читается не больше FOLLOW_GRAPH_MAX_IDS + 1 id; для
+    более длинного списка - запрос `.exists()`."""
+    if user_id is None:
+        return False
+    key = KEY.format(FOLLOWING, user_id)
+    raw = cache.get(key)
+    if raw is None:
+        limit = settings.FOLLOW_GRAPH_MAX_IDS
+        ids = Follow.objects.filter(user_id=user_id).order_by(
+            'author_id'
+        ).values_list('author_id', flat=True)[:limit + 1]
+        ids = array(TYPECODE, ids)
+        raw = ids.tobytes() if len(ids) <= limit else TOO_LONG
+        cache.set(key, raw, settings.FOLLOW_GRAPH_TIMEOUT)
+    if raw == TOO_LONG:
+        return Follow.objects.filter(
+            user_id=user_id, author_id=author_id
+        ).exists()
+    return contains(_unpack(raw), author_id)
+
+
+def invalidate(user_id, author_id):
+    """Сбрасывает массивы после подписки или отписки: сразу, чтобы
+    сама транзакция видела новое состояние, и ещё раз после коммита.
+    Пока транзакция открыта, параллельный запрос может успеть положить
+    в кеш прежнее состояние, и без второго сброса оно жило бы весь
+    FOLLOW_GRAPH_TIMEOUT."""
+    keys = [KEY.format(FOLLOWING, user_id), KEY.format(FOLLOWERS, author_id)]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_all():
+    """Сбрасывает массивы всех пользователей, например после загрузки
+    подписок через bulk_create, которая не вызывает сигналы."""
+    user_ids = User.objects.order_by().values_list('pk', flat=True)
+    batch = []
+    for user_id in user_ids.iterator():
+        batch += [KEY.format(FOLLOWING, user_id),
+                  KEY.format(FOLLOWERS, user_id)]
+        if len(batch) >= BATCH_SIZE:
+            cache.delete_many(batch)
+            batch = []
+    if batch:
+        cache.delete_many(batch)
+
+
+def rank(user_id, own, second_hop, limit):
+    """Друзья друзей по числу общих связей, затем по id. `own` -
+    массив подписок пользователя, `second_hop` - подписки его авторов."""
+    overlap = Counter()
+    for author_id in own:
+        overlap.update(second_hop.get(author_id, ()))
+    candidates = [
+        (-count, candidate) for candidate, count in overlap.items()
+        if candidate != user_id and not contains(own, candidate)
+    ]
+    candidates.sort()
+    return [candidate for _, candidate in candidates[:limit]]
+
+
+def compute_suggestions(user_ids, limit=None):
+    """Рекомендации для нескольких пользователей: {user_id: [id]}."""
+    limit = limit or settings.FOLLOW_SUGGESTIONS_LIMIT
+    own = _load(FOLLOWING, user_ids)
+    second_hop = _load(
+        FOLLOWING, {author_id for ids in own.values() for author_id in ids}
+    )
+    return {
+        user_id: rank(user_id, ids, second_hop, limit)
+        for user_id, ids in own.items()
+    }
+
+
+def refresh_suggestions(batch_size=BATCH_SIZE):
+    """Пересчитывает рекомендации всех, у кого есть подписки, пачками.
+    Возвращает число пользователей с изменившимся списком."""
+    user_ids = Follow.objects.order_by('user_id').values_list(
+        'user_id', flat=True
+    ).distinct()
+    changed = 0
+    batch = []
+    for user_id in user_ids.iterator():
+        batch.append(user_id)
+        if len(batch) >= batch_size:
+            changed += _store_suggestions(batch)
+            batch = []
+    if batch:
+        changed += _store_suggestions(batch)
+    return changed
+
+
+def _store_suggestions(user_ids):
+    computed = compute_suggestions(user_ids)
+    keys = {SUGGESTIONS_KEY.format(user_id): user_id for user_id in user_ids}
+    previous = cache.get_many(keys)
+    packed = {
+        key: _pack(computed[user_id]) for key, user_id in keys.items()
+    }
+    cache.set_many(packed, settings.FOLLOW_SUGGESTIONS_TIMEOUT)
+    changed = [
+        user_id for key, user_id in keys.items()
+        if previous.get(key) != packed[key]
+    ]
+    if changed:
+        # Блок рекомендаций входит в ETag страниц профиля и подписок.
+        feed_cache.bump(*(f'suggestions:{user_id}' for user_id in changed))
+    return len(changed)
+
+
+def suggested_authors(user, limit=None):
+    """Готовые рекомендации для страницы: пользователи в порядке
+    ранга, без тех, на кого уже подписан."""
+    if not user.is_authenticated:
+        return []
+    raw = cache.get(SUGGESTIONS_KEY.format(user.pk))
+    if not raw:
+        return []
+    own = following(user.pk)
+    ids = [
+        author_id for author_id in _unpack(raw)
+        if not contains(own, author_id)
+    ][:limit or settings.FOLLOW_SUGGESTIONS_SHOWN]
+    if not ids:
+        return []
+    found = User.objects.only(
+        'username', 'first_name', 'last_name'
+    ).in_bulk(ids)
+    return [found[author_id] for author_id in ids if author_id in found]
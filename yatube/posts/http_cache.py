@@ -0,0 +1,152 @@
+"""Условные GET-запросы для лент и страниц постов.
+
+ETag и Last-Modified строятся из поколений `feed_cache` без рендеринга
+и почти без обращений к базе, поэтому повторный запрос браузера или
+обратного прокси получает 304 Not Modified, не трогая шаблоны.
+Анонимные страницы помечаются как публичные, чтобы их мог хранить
+прокси; страницы авторизованных пользователей остаются частными.
+
+Поколения хранятся в кеше Django, поэтому валидаторы верны, только
+если кеш общий для всех воркеров: в LocMemCache запись в одном воркере
+не сдвигает поколения в другом, и тот продолжал бы отвечать 304 на
+устаревший ETag. Поэтому без общего кеша вне DEBUG заголовки не
+выставляются (настройка PAGE_ETAGS).
+
+Поколения сдвигаются ещё раз после коммита записи (`feed_cache.bump`):
+ETag, выданный вместе со страницей, собранной по старым строкам, пока
+транзакция была открыта, после коммита уже не совпадёт.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+
+from core import db_router
+
+from . import feed_cache
+from .models import Group, Post, User
+
+
+def shared_max_age():
+    return getattr(settings, 'PAGE_CACHE_SHARED_MAX_AGE', 10)
+
+
+def etags_enabled():
+    return getattr(settings, 'PAGE_ETAGS', True)
+
+
+def validators(request, scopes):
+    """ETag и Last-Modified страницы с данными из областей `scopes`."""
+    scopes = ['users', *scopes]
+    generations = feed_cache.generations(scopes)
+    state = '|'.join([
+        request.get_full_path(),
+        str(request.user.pk),
+        # Формы страниц авторизованного пользователя содержат CSRF-токен,
+        # а вход в систему меняет куку: после нового входа старая
+        # страница с прежним токеном не должна получить 304.
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+        if request.user.is_authenticated else '',
+        db_router.read_source(),
+        *(f'{scope}={gen}' for scope, gen in zip(scopes, generations)),
+    ])
+    etag = quote_etag(hashlib.md5(state.encode()).hexdigest())
+    last_modified = datetime.fromtimestamp(
+        max(generations) / 1000, tz=timezone.utc
+    ).replace(microsecond=0)
+    return etag, last_modified
+
+
+def patch_caching_headers(request, response, etag, last_modified):
+    response.setdefault('ETag', etag)
+    response.setdefault('Last-Modified', http_date(last_modified.timestamp()))
+    patch_vary_headers(response, ('Cookie',))
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(
+            response, public=True, max_age=0, s_maxage=shared_max_age()
+        )
+    return response
+
+
+def conditional_page(scopes_for):
+    """Декоратор view: `scopes_for(request, **kwargs)` возвращает области,
+    от которых зависит страница, или None, если объекта нет."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not etags_enabled():
+                return view(request, *args, **kwargs)
+            scopes = scopes_for(request, **kwargs)
+            if scopes is None:
+                return view(request, *args, **kwargs)
+            etag, last_modified = validators(request, scopes)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified.timestamp()
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code not in (200, 304):
+                return response
+            return patch_caching_headers(
+                request, response, etag, last_modified
+            )
+        return wrapper
+    return decorator
+
+
+def viewer_scopes(request):
+    """Блок «Вам могут понравиться» авторизованного зрителя."""
+    if not request.user.is_authenticated:
+        return []
+    return [f'suggestions:{request.user.pk}']
+
+
+def index_scopes(request):
+    return ['posts']
+
+
+def group_scopes(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return [f'group:{group_id}']
+
+
+def author_scopes(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return [f'author:{author_id}']
+
+
+def profile_scopes(request, username):
+    scopes = author_scopes(request, username)
+    if scopes is None:
+        return None
+    # Кнопка подписки и рекомендации зависят от зрителя.
+    return [*scopes, f'timeline:{request.user.pk}', *viewer_scopes(request)]
+
+
+def post_scopes(request, post_id):
+    post = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'group_id'
+    ).first()
+    if post is None:
+        return None
+    author_id, group_id = post
+    return [f'post:{post_id}', f'author:{author_id}', f'group:{group_id}']
+
+
+def follow_scopes(request):
+    return ['posts', f'timeline:{request.user.pk}', *viewer_scopes(request)]
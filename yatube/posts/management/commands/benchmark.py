@@ -0,0 +1,102 @@
+import json
+import subprocess
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts import benchmark
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет временную базу синтетическими данными и замеряет '
+        'время ответа, число SQL-запросов и размер страниц.'
+    )
+
+    def add_arguments(self, parser):
+        for name, default in benchmark.DATASET.items():
+            parser.add_argument(
+                f"--{name.replace('_', '-')}", dest=name,
+                type=type(default), default=default,
+                help=f'Размер набора данных: {name} (по умолчанию '
+                     f'{default}).',
+            )
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--view', action='append', dest='views',
+            help='Замерить только эту страницу; можно повторять.',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--render', action='store_true',
+            help='Замерить и рендеринг ленты с 10, 50 и 100 постами.',
+        )
+        parser.add_argument(
+            '--output', help='Файл для JSON; по умолчанию stdout.',
+        )
+        parser.add_argument(
+            '--baseline', help='JSON прошлого прогона для сравнения.',
+        )
+
+    def handle(self, *args, **options):
+        dataset_options = {
+            name: options[name] for name in benchmark.DATASET
+        }
+        with benchmark.sandbox():
+            dataset = benchmark.seed(seed=options['seed'], **dataset_options)
+            results = benchmark.run(
+                dataset,
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                only=options['views'],
+                cold=options['cold'],
+            )
+            if options['render']:
+                render = benchmark.render_pages(
+                    iterations=options['iterations'],
+                    warmup=options['warmup'],
+                )
+
+        report = {
+            'revision': git_revision(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'dataset': dataset_options,
+            'iterations': options['iterations'],
+            'cold': options['cold'],
+            'views': results,
+        }
+        if options['render']:
+            report['render'] = render
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+            report['changes'] = benchmark.compare(
+                baseline['views'], results
+            )
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(
+                f"Результаты записаны в {options['output']}"
+            ))
+        else:
+            self.stdout.write(output)
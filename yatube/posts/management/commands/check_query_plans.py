@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import benchmark, query_plans
+
+DUMMY_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет запросы страниц через EXPLAIN QUERY PLAN и падает, '
+        'если какой-то из них читает таблицу целиком или сортирует '
+        'во временном B-дереве.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=200)
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Печатать планы всех запросов, а не только проблемных.',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(
+                'EXPLAIN QUERY PLAN поддерживается только для SQLite.'
+            )
+        with benchmark.sandbox(CACHES=DUMMY_CACHES):
+            dataset = benchmark.seed(
+                users=20, groups=3, posts=options['posts'],
+                comments=options['posts'], follows=5, image_ratio=0,
+            )
+            report = query_plans.check(dataset)
+
+        failed = [entry for entry in report if entry['problems']]
+        for entry in report:
+            if not (entry['problems'] or options['verbose_plans']):
+                continue
+            self.stdout.write(f"{entry['view']} {entry['url']}")
+            self.stdout.write(f"  {entry['sql']}")
+            for step in entry['plan']:
+                self.stdout.write(f'    {step}')
+            for step in entry['problems']:
+                self.stdout.write(self.style.ERROR(f'  ! {step}'))
+        if failed:
+            raise CommandError(
+                f'Запросов с полным проходом или сортировкой: {len(failed)}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено запросов: {len(report)}, проблем нет'
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import bulk
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты, комментарии или подписки в JSON Lines или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(bulk.KINDS))
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=bulk.FORMATS,
+            help='По умолчанию - по расширению файла.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=bulk.BATCH_SIZE,
+            help='Сколько строк читать из базы за раз.',
+        )
+
+    def handle(self, *args, kind, path, **options):
+        fmt = options['format'] or bulk.guess_format(path)
+        if fmt not in bulk.FORMATS:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        stats = bulk.export_file(
+            kind, path, fmt, chunk_size=options['chunk_size'],
+            progress=lambda stats: self.stdout.write(str(stats)),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено {kind}: {stats} за {stats.seconds:.1f} с'
+        ))
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import bulk
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты, комментарии или подписки из JSON Lines или CSV '
+        'пачками; прерванная загрузка продолжается с контрольной точки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(bulk.KINDS))
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=bulk.FORMATS,
+            help='По умолчанию - по расширению файла.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=bulk.BATCH_SIZE,
+            help='Сколько строк вставлять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Заводить пользователей и группы, которых нет в базе.',
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать сначала, не глядя на контрольную точку.',
+        )
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не пересчитывать счётчики и ленты в конце (например, '
+                 'если дальше загружаются другие файлы).',
+        )
+
+    def handle(self, *args, kind, path, **options):
+        fmt = options['format'] or bulk.guess_format(path)
+        if fmt not in bulk.FORMATS:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        resumed = bulk.load_checkpoint(bulk.checkpoint_path(path))
+        if resumed and not options['restart']:
+            self.stdout.write(f'Продолжаем со строки {resumed + 1}')
+        try:
+            stats = bulk.import_file(
+                kind, path, fmt,
+                batch_size=options['batch_size'],
+                create_missing=options['create_missing'],
+                resume=not options['restart'],
+                progress=lambda stats: self.stdout.write(str(stats)),
+            )
+        except bulk.BadRecord as error:
+            raise CommandError(
+                f'{error}. Загруженные пачки сохранены; после исправления '
+                f'файла загрузка продолжится с контрольной точки.'
+            )
+        except OSError as error:
+            raise CommandError(error)
+        if stats.conflicts:
+            self.stderr.write(self.style.WARNING(
+                f'Строк с уже занятыми id: {stats.conflicts}; существующие '
+                f'записи оставлены без изменений.'
+            ))
+        if not options['skip_derived']:
+            bulk.finish([kind])
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {kind}: {stats} за {stats.seconds:.1f} с'
+        ))
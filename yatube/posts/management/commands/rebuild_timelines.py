@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', dest='usernames', action='append', default=[],
+            help='Пересобрать ленту только этого пользователя.',
+        )
+
+    def handle(self, *args, usernames, **options):
+        rebuilt = timeline.rebuild(usernames)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано подписок: {rebuilt}'
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import follow_graph
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рекомендации авторов «Вам могут понравиться» '
+            'по графу подписок.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch', type=int, default=follow_graph.BATCH_SIZE,
+            help='Сколько пользователей обрабатывать за раз.',
+        )
+
+    def handle(self, *args, batch, **options):
+        changed = follow_graph.refresh_suggestions(batch_size=batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендации обновлены у пользователей: {changed}'
+        ))
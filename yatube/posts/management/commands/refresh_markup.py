@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import feed_cache, markup
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = ('Перерисовывает HTML постов и комментариев, отрисованный '
+            'прежней версией разметки.')
+
+    def handle(self, *args, **options):
+        posts = markup.refresh(Post)
+        comments = markup.refresh(Comment)
+        if posts or comments:
+            feed_cache.bump('posts')
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено постов: {posts}, комментариев: {comments}'
+        ))
@@ -0,0 +1,120 @@
+"""Разметка текстов постов и комментариев.
+
+Текст превращается в HTML один раз при сохранении и хранится рядом
+с исходным (`text_html`) вместе с номером версии рендерера. Лента
+выводит готовую строку без обработки. Если рендерер меняется,
+VERSION увеличивается: устаревшие строки до пересчёта показываются
+с разметкой на лету (без ссылок на упоминания, чтобы не ходить
+в базу из шаблона), а первая такая встреча ставит в очередь задачу
+`posts.tasks.refresh_markup`, которая перерисовывает их пачками.
+
+Поддерживается: ссылки http(s), упоминания @username, **жирный**,
+*курсив*, `код`, абзацы и переносы строк. Весь текст сначала
+экранируется, а теги добавляет только сам рендерер, поэтому чужой
+HTML в вывод не попадает.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.html import escape, linebreaks
+
+VERSION = 1
+
+BATCH_SIZE = 500
+# Как часто можно заново ставить пересчёт в очередь, секунд.
+REFRESH_INTERVAL = 60
+
+# Текст уже экранирован: кавычки и угловые скобки стали сущностями.
+URL_RE = re.compile(r'https?://(?:(?!&(?:quot|#x27|lt|gt);)[^\s<>])+')
+MENTION_RE = re.compile(r'(?<![\w@&])@(\w[\w.+-]*\w|\w)')
+BOLD_RE = re.compile(r'\*\*(?=\S)(.+?)(?<=\S)\*\*')
+ITALIC_RE = re.compile(r'(?<![*\w])\*(?=\S)([^*\n]+?)(?<=\S)\*(?![*\w])')
+CODE_RE = re.compile(r'`([^`\n]+)`')
+TRAILING_PUNCTUATION = '.,;:!?)'
+
+
+def mentions(text):
+    return set(MENTION_RE.findall(text or ''))
+
+
+def known_users(texts):
+    """Существующие username из упоминаний в текстах, одним запросом."""
+    names = set().union(*map(mentions, texts))
+    if not names:
+        return frozenset()
+    return frozenset(get_user_model().objects.filter(
+        username__in=names
+    ).values_list('username', flat=True))
+
+
+def _link(url):
+    stripped = url.rstrip(TRAILING_PUNCTUATION)
+    tail = url[len(stripped):]
+    return (f'<a href="{stripped}" rel="nofollow noopener" '
+            f'target="_blank">{stripped}</a>{tail}')
+
+
+def _format(segment, users):
+    def mention(match):
+        name = match.group(1)
+        if name not in users:
+            return match.group(0)
+        url = reverse('posts:profile', args=[name])
+        return f'<a href="{url}">@{name}</a>'
+
+    segment = MENTION_RE.sub(mention, segment)
+    segment = CODE_RE.sub(r'<code>\1</code>', segment)
+    segment = BOLD_RE.sub(r'<strong>\1</strong>', segment)
+    return ITALIC_RE.sub(r'<em>\1</em>', segment)
+
+
+def render(text, users=None):
+    """HTML для текста. `users` - username, на которые ставятся ссылки;
+    по умолчанию берутся из базы."""
+    if users is None:
+        users = known_users([text])
+    escaped = escape(text or '')
+    parts = []
+    position = 0
+    for match in URL_RE.finditer(escaped):
+        parts.append(_format(escaped[position:match.start()], users))
+        parts.append(_link(match.group(0)))
+        position = match.end()
+    parts.append(_format(escaped[position:], users))
+    return linebreaks(''.join(parts), autoescape=False)
+
+
+def render_many(texts):
+    """HTML для нескольких текстов с одним запросом упоминаний."""
+    texts = list(texts)
+    users = known_users(texts)
+    return [render(text, users) for text in texts]
+
+
+def schedule_refresh():
+    """Ставит пересчёт устаревшей разметки в очередь, не чаще раза
+    в REFRESH_INTERVAL секунд."""
+    from . import tasks
+    from core.tasks import enqueue
+
+    if cache.add(f'markup-refresh:{VERSION}', True, REFRESH_INTERVAL):
+        enqueue(tasks.refresh_markup, key='refresh_markup')
+
+
+def refresh(model, batch_size=BATCH_SIZE):
+    """Перерисовывает строки `model` с устаревшей версией рендерера.
+    Возвращает число обновлённых строк."""
+    updated = 0
+    while True:
+        rows = list(model.objects.exclude(
+            markup_version=VERSION
+        ).only('text').order_by('pk')[:batch_size])
+        if not rows:
+            return updated
+        for row, html in zip(rows, render_many(row.text for row in rows)):
+            row.text_html = html
+            row.markup_version = VERSION
+        model.objects.bulk_update(rows, ['text_html', 'markup_version'])
+        updated += len(rows)
@@ -1,6 +1,12 @@
+import json
+
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.db.models import CharField
+from django.utils.functional import cached_property
+from django.utils.safestring import mark_safe
+
+from . import markup
 
 User = get_user_model()
 
@@ -20,6 +26,11 @@ class Group(models.Model):
         verbose_name='Описание',
         help_text='Введите описание',
     )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Число постов',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name_plural = 'Группы постов',
@@ -28,7 +39,44 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class RenderedText(models.Model):
+    """Текст с готовым HTML (`posts.markup`), который пересчитывается
+    при каждом сохранении, затрагивающем text."""
+    text_html = models.TextField(
+        verbose_name='HTML текста',
+        blank=True,
+        default='',
+        editable=False,
+    )
+    markup_version = models.PositiveSmallIntegerField(
+        verbose_name='Версия разметки',
+        default=0,
+        editable=False,
+    )
+
+    class Meta:
+        abstract = True
+
+    def render_text(self, users=None):
+        self.text_html = markup.render(self.text, users)
+        self.markup_version = markup.VERSION
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is None or 'text' in update_fields:
+            self.render_text()
+            if update_fields is not None:
+                update_fields = {*update_fields, 'text_html', 'markup_version'}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+    @property
+    def html(self):
+        if self.markup_version == markup.VERSION:
+            return mark_safe(self.text_html)
+        markup.schedule_refresh()
+        return mark_safe(markup.render(self.text, users=frozenset()))
+
+
+class Post(RenderedText):
     text = models.TextField(
         verbose_name='Текст',
     )
@@ -56,17 +104,44 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Число комментариев',
+        default=0,
+        editable=False,
+    )
+    thumbnails = models.TextField(
+        verbose_name='Адреса превью',
+        blank=True,
+        default='',
+        editable=False,
+    )
 
     class Meta:
         verbose_name_plural = 'Список постов',
         verbose_name = 'Пост'
         ordering = ['-pub_date'][:10]
+        # Ленты автора и группы читаются в порядке ('-pub_date', '-pk').
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @cached_property
+    def thumbnail_urls(self):
+        """Готовые превью картинки: {имя размера: адрес}."""
+        return json.loads(self.thumbnails) if self.thumbnails else {}
+
 
-class Comment(models.Model):
+class Comment(RenderedText):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -91,6 +166,12 @@ class Comment(models.Model):
         verbose_name_plural = 'Список комментариев',
         verbose_name = 'Комментарий'
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_id_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text
@@ -117,6 +198,208 @@ class Follow(models.Model):
             fields=['user', 'author'],
             name='unique_follow'),
         ]
+        # Уникальный индекс начинается с user; подписчиков автора
+        # ищет этот.
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'Пользователь "{self.user}" подписан на "{self.author}"'
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые иначе пришлось бы считать COUNT(*).
+
+    Обновляются в той же транзакции, что и пост или подписка;
+    расхождения исправляет команда `reconcile_counters`.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Число постов',
+        default=0,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Число подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Число подписок',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return f'Счётчики "{self.user_id}"'
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя.
+
+    Заполняется при публикации поста (fan-out-on-write) и при подписке,
+    очищается при отписке. Автор и дата поста хранятся денормализованно:
+    отписка удаляет записи без соединения с постами, а страница ленты
+    читается по индексу (user, -pub_date, -post) без сортировки.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'post'],
+            name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx',
+            ),
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'Пост {self.post_id} в ленте "{self.user_id}"'
+
+
+class SearchEntry(models.Model):
+    """Строка инвертированного индекса: терм встречается в тексте поста
+    (comment пуст) или в одном из его комментариев `count` раз."""
+    term = models.CharField(
+        max_length=64,
+        verbose_name='Терм',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пост',
+    )
+    comment = models.ForeignKey(
+        Comment,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Комментарий',
+    )
+    count = models.PositiveIntegerField(
+        verbose_name='Число вхождений',
+        default=1,
+    )
+
+    class Meta:
+        verbose_name = 'Запись поискового индекса'
+        verbose_name_plural = 'Поисковый индекс'
+        indexes = [
+            models.Index(fields=['term', 'post'], name='search_term_post_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.term} -> {self.post_id}'
+
+
+class Notification(models.Model):
+    """Событие для письма-дайджеста: новый пост автора, на которого
+    подписан получатель, или комментарий к его посту.
+
+    Письма не отправляются по одному: события копятся и уходят
+    дайджестом (`posts.notifications.send_digests`), после чего
+    получают sent_at.
+    """
+    NEW_POST = 'post'
+    NEW_COMMENT = 'comment'
+    VERBS = (
+        (NEW_POST, 'Новый пост'),
+        (NEW_COMMENT, 'Новый комментарий'),
+    )
+
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Получатель',
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор события',
+    )
+    verb = models.CharField(
+        max_length=16,
+        choices=VERBS,
+        verbose_name='Событие',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пост',
+    )
+    comment = models.ForeignKey(
+        Comment,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Комментарий',
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата события',
+        auto_now_add=True,
+    )
+    sent_at = models.DateTimeField(
+        verbose_name='Дата отправки',
+        blank=True,
+        null=True,
+    )
+
+    class Meta:
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+        # Отправленные уведомления в индекс не попадают: рассылка
+        # ищет только ожидающие.
+        indexes = [
+            models.Index(
+                fields=['recipient', 'created'],
+                name='notification_pending_idx',
+                condition=models.Q(sent_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.get_verb_display()} для "{self.recipient_id}"'
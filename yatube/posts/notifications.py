@@ -0,0 +1,135 @@
+"""Уведомления о новых постах и комментариях письмами-дайджестами.
+
+Событие не отправляет письмо само: фоновая задача записывает строки
+Notification получателям и ставит в очередь рассылку с задержкой
+NOTIFICATIONS_DIGEST_DELAY. Пока рассылка ждёт, новые события
+копятся, и каждый получатель получает одно письмо обо всём сразу.
+Письма уходят пачками по NOTIFICATIONS_BATCH_SIZE получателей, одна
+пачка - одно соединение с почтовым сервером.
+
+Частота событий одного автора ограничена NOTIFICATIONS_RATE_LIMIT:
+сверх лимита посты и комментарии публикуются, но уведомлений
+не порождают, поэтому активный автор не заваливает подписчиков.
+"""
+from itertools import groupby
+from operator import attrgetter
+
+from django.conf import settings
+from django.core import mail
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from core import ratelimit
+
+from .models import Comment, Follow, Notification, Post
+
+SUBJECT = 'Новое на Yatube'
+
+
+def allow(actor_id):
+    limit, period = settings.NOTIFICATIONS_RATE_LIMIT
+    return ratelimit.allow(f'notify:{actor_id}', limit, period)
+
+
+def notify_followers(post_id):
+    """Уведомления подписчикам автора о новом посте. Возвращает число
+    созданных."""
+    post = Post.objects.only('author').filter(pk=post_id).first()
+    if post is None or not allow(post.author_id):
+        return 0
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).exclude(user__email='').values_list('user_id', flat=True)
+    created = Notification.objects.bulk_create(
+        (
+            Notification(
+                recipient_id=user_id,
+                actor_id=post.author_id,
+                verb=Notification.NEW_POST,
+                post_id=post.pk,
+            )
+            for user_id in followers.iterator()
+        ),
+        batch_size=settings.NOTIFICATIONS_BATCH_SIZE,
+    )
+    return len(created)
+
+
+def notify_comment(comment_id):
+    """Уведомление автору поста о комментарии. Свои комментарии
+    и авторы без почты не уведомляются."""
+    comment = Comment.objects.select_related('post__author').filter(
+        pk=comment_id
+    ).first()
+    if comment is None:
+        return 0
+    author = comment.post.author
+    if (author.pk == comment.author_id or not author.email
+            or not allow(comment.author_id)):
+        return 0
+    Notification.objects.create(
+        recipient=author,
+        actor_id=comment.author_id,
+        verb=Notification.NEW_COMMENT,
+        post_id=comment.post_id,
+        comment=comment,
+    )
+    return 1
+
+
+def _url(post_id):
+    return settings.SITE_URL + reverse(
+        'posts:post_detail', kwargs={'post_id': post_id}
+    )
+
+
+def digest(recipient, notifications):
+    """Письмо одному получателю обо всех его событиях."""
+    limit = settings.NOTIFICATIONS_DIGEST_ITEMS
+    posts, comments = [], []
+    for notification in notifications[:limit]:
+        items = comments
+        if notification.verb == Notification.NEW_POST:
+            items = posts
+        items.append({
+            'notification': notification,
+            'url': _url(notification.post_id),
+        })
+    body = render_to_string('posts/email/digest.txt', {
+        'recipient': recipient,
+        'posts': posts,
+        'comments': comments,
+        'hidden': max(len(notifications) - limit, 0),
+        'site_url': settings.SITE_URL,
+    })
+    return mail.EmailMessage(SUBJECT, body, to=[recipient.email])
+
+
+def send_digests(batch_size=None):
+    """Отправляет накопленные уведомления. Возвращает число писем."""
+    batch_size = batch_size or settings.NOTIFICATIONS_BATCH_SIZE
+    pending = Notification.objects.filter(sent_at__isnull=True)
+    recipients = list(pending.order_by('recipient_id').values_list(
+        'recipient_id', flat=True
+    ).distinct())
+    sent = 0
+    for start in range(0, len(recipients), batch_size):
+        notifications = list(pending.filter(
+            recipient_id__in=recipients[start:start + batch_size]
+        ).select_related(
+            'recipient', 'actor', 'post', 'comment'
+        ).order_by('recipient_id', 'created', 'pk'))
+        messages = []
+        for _, group in groupby(notifications, attrgetter('recipient_id')):
+            group = list(group)
+            messages.append(digest(group[0].recipient, group))
+        with mail.get_connection() as connection:
+            connection.send_messages(messages)
+        # Помечаем только прочитанные строки: пришедшие во время
+        # отправки уйдут следующим дайджестом.
+        Notification.objects.filter(
+            pk__in=[notification.pk for notification in notifications]
+        ).update(sent_at=timezone.now())
+        sent += len(messages)
+    return sent
@@ -0,0 +1,404 @@
+import base64
+import binascii
+import hashlib
+import json
+from math import ceil
+
+from django.conf import settings
+from django.core.paginator import (
+    EmptyPage, Page, PageNotAnInteger, Paginator,
+)
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from django.utils.timezone import is_naive
+
+from core.cache import get_or_set_coalesced
+
+CURSOR_PARAM = 'cursor'
+PAGE_PARAM = 'page'
+LIMIT_PARAM = 'limit'
+# Границы BIGINT: больший id база не сравнит, а SQLite упадёт
+# с OverflowError.
+MIN_ID, MAX_ID = -2 ** 63, 2 ** 63 - 1
+
+
+def encode_cursor(date, pk, number, backwards=False):
+    """Упаковывает позицию в ленте в непрозрачный токен для `?cursor=`."""
+    payload = json.dumps(
+        [date.isoformat(), pk, number, int(backwards)],
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (date, pk, number, backwards) или None,
+    если токен повреждён: не декодируется, содержит дату без часового
+    пояса или числа за пределами 64-битного целого."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw_date, pk, number, backwards = json.loads(
+            base64.urlsafe_b64decode(padded.encode()).decode()
+        )
+        date = parse_datetime(raw_date)
+        pk, number = int(pk), int(number)
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        return None
+    if date is None or is_naive(date):
+        return None
+    if not (MIN_ID <= pk <= MAX_ID and MIN_ID <= number <= MAX_ID):
+        return None
+    return date, pk, max(number, 1), bool(backwards)
+
+
+def estimated_rows(model, using='default'):
+    """Число строк таблицы `model` по статистике базы, без COUNT(*).
+    None, если статистики нет (SQLite до ANALYZE, другие базы)."""
+    connection = connections[using]
+    table = model._meta.db_table
+    queries = {
+        'postgresql': (
+            'SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)'
+        ),
+        'mysql': (
+            'SELECT table_rows FROM information_schema.tables '
+            'WHERE table_schema = DATABASE() AND table_name = %s'
+        ),
+        # Первое число в stat - строк в таблице на момент ANALYZE.
+        'sqlite': 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+    }
+    if connection.vendor not in queries:
+        return None
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # Таблица статистики появляется только после ANALYZE.
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone() is None:
+                return None
+        cursor.execute(queries[connection.vendor], [table])
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    try:
+        rows = int(float(str(row[0]).split()[0]))
+    except (IndexError, ValueError):
+        return None
+    # PostgreSQL отдаёт -1 для таблицы, которую ещё не анализировали.
+    return rows if rows >= 0 else None
+
+
+def _is_whole_table(queryset):
+    query = queryset.query
+    return not (
+        query.where or query.distinct or query.group_by
+        or query.combinator or query.low_mark or query.high_mark is not None
+    )
+
+
+class CountedPaginator(Paginator):
+    """Постраничный вывод со смещением без COUNT(*) на каждый запрос.
+
+    Число строк берётся из готового счётчика (`count=`, например
+    `Group.posts_count`), иначе из кеша: COUNT(*) выполняет один процесс
+    раз в PAGINATOR_COUNT_TIMEOUT секунд. Для таблицы целиком больше
+    PAGINATOR_ESTIMATE_THRESHOLD строк вместо COUNT(*) берётся оценка
+    из статистики базы (`count_is_estimate`). Статистика может отставать
+    сколько угодно, поэтому оценка идёт только в полосу номеров: номер
+    страницы по ней не проверяется, а есть ли следующая страница, видно
+    по лишней строке в выборке (per_page + 1). Полоса номеров страниц
+    ограничена окном `page_window`.
+    """
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._known_count = count
+        self.count_is_estimate = False
+        self._fetched_num_pages = None
+
+    @cached_property
+    def count(self):
+        if self._known_count is not None:
+            return self._known_count
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        if self.object_list.query.is_empty():
+            return 0
+        count, self.count_is_estimate = get_or_set_coalesced(
+            self._count_key(), self._count_rows,
+            settings.PAGINATOR_COUNT_TIMEOUT,
+        )
+        return count
+
+    def _count_key(self):
+        queryset = self.object_list
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.md5(f'{sql}|{params!r}'.encode()).hexdigest()
+        return f'paginator-count:{queryset.db}:{digest}'
+
+    def _count_rows(self):
+        queryset = self.object_list
+        if _is_whole_table(queryset):
+            estimate = estimated_rows(queryset.model, queryset.db)
+            threshold = settings.PAGINATOR_ESTIMATE_THRESHOLD
+            if estimate is not None and estimate >= threshold:
+                return estimate, True
+        return queryset.count(), False
+
+    @property
+    def num_pages(self):
+        # По оценке страниц столько, сколько видно из выбранных строк.
+        if self._fetched_num_pages is not None:
+            return self._fetched_num_pages
+        return self._pages_for(self.count)
+
+    def _pages_for(self, count):
+        if count == 0 and not self.allow_empty_first_page:
+            return 0
+        return ceil(max(1, count - self.orphans) / self.per_page)
+
+    def _is_estimated(self):
+        return self.count is not None and self.count_is_estimate
+
+    def validate_number(self, number):
+        if not self._is_estimated():
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        if not self._is_estimated():
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        self._fetched_num_pages = number + int(len(rows) > self.per_page)
+        return self._get_page(rows[:self.per_page], number, self)
+
+    def get_page(self, number):
+        if not self._is_estimated():
+            return super().get_page(number)
+        try:
+            return self.page(number)
+        except PageNotAnInteger:
+            return self.page(1)
+        except EmptyPage:
+            # Номер за концом таблицы: последнюю страницу по оценке
+            # не найти, поэтому один раз считаем строки точно.
+            self.count = self.object_list.count()
+            self.count_is_estimate = False
+            return super().get_page(number)
+
+    def page_window(self, number):
+        """Номера страниц вокруг `number` и по краям; None - пропуск.
+        Длина не зависит от числа страниц."""
+        side = settings.PAGINATOR_WINDOW
+        last = self.num_pages
+        if self._is_estimated():
+            last = max(last, self._pages_for(self.count))
+        start, end = max(number - side, 1), min(number + side, last)
+        window = []
+        if start > 1:
+            window.append(1)
+            if start > 2:
+                window.append(None)
+        window.extend(range(start, end + 1))
+        if end < last:
+            if end < last - 1 or self.count_is_estimate:
+                window.append(None)
+            # По оценке номер последней страницы неточен.
+            if not self.count_is_estimate:
+                window.append(last)
+        return window
+
+
+class CursorPaginator(CountedPaginator):
+    """Постраничный вывод по ключу (дата, id); поле даты - `date_field`.
+    Строками могут быть объекты моделей или словари из `.values()`
+    с ключами `id` и `date_field`.
+
+    Страница выбирается условием `WHERE (pub_date, id) < (...)`
+    вместо OFFSET, поэтому глубокие страницы стоят столько же,
+    сколько первая, и COUNT(*) не выполняется. Старые ссылки вида
+    `?page=N` обслуживаются обычным постраничным выводом.
+    """
+
+    date_field = 'pub_date'
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        self.ordering = (f'-{self.date_field}', '-pk')
+        super().__init__(
+            self.order(object_list), per_page, count=count, **kwargs
+        )
+        self.is_keyset = False
+        self._keyset_num_pages = None
+
+    def order(self, object_list):
+        return object_list.order_by(*self.ordering)
+
+    @property
+    def num_pages(self):
+        if self._keyset_num_pages is not None:
+            return self._keyset_num_pages
+        return super().num_pages
+
+    def page_state(self, page):
+        """Всё, что шаблонам нужно от страницы, без ссылки на queryset:
+        строки, номер, курсоры и число страниц. Годится для кеша."""
+        return {
+            'rows': list(page.object_list),
+            'number': page.number,
+            'num_pages': self.num_pages,
+            'is_keyset': self.is_keyset,
+            'count': None if self.is_keyset else self.count,
+            'count_is_estimate': self.count_is_estimate,
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+        }
+
+    def restore_page(self, state):
+        """Страница из `page_state()` без запросов к базе."""
+        self.is_keyset = state['is_keyset']
+        self._keyset_num_pages = state['num_pages']
+        if state['count'] is not None:
+            self.count = state['count']
+        self.count_is_estimate = state['count_is_estimate']
+        page = Page(state['rows'], state['number'], self)
+        page.next_cursor = state['next_cursor']
+        page.previous_cursor = state['previous_cursor']
+        return page
+
+    def get_page_from_request(self, request):
+        token = request.GET.get(CURSOR_PARAM)
+        if token is None and request.GET.get(PAGE_PARAM) is not None:
+            page = self.get_page(request.GET.get(PAGE_PARAM))
+            self._set_cursors(page)
+            return page
+        cursor = decode_cursor(token) if token else None
+        return self.get_cursor_page(cursor)
+
+    def get_cursor_page(self, cursor=None):
+        """Возвращает страницу, начинающуюся сразу за курсором."""
+        self.is_keyset = True
+        if cursor is None:
+            return self._build_page(self._rows(), 1)
+        date, pk, number, backwards = cursor
+        if not backwards:
+            rows = self._rows((date, pk))
+            return self._build_page(rows, max(number, 2))
+        rows = self._rows((date, pk), backwards=True)
+        if len(rows) <= self.per_page:
+            # Перед курсором меньше целой страницы: это начало ленты.
+            return self.get_cursor_page()
+        rows = rows[:self.per_page][::-1]
+        page = Page(rows, max(number, 2), self)
+        self._keyset_num_pages = page.number + 1
+        self._set_cursors(page)
+        return page
+
+    def _after(self, date, pk, lookup):
+        field = self.date_field
+        return (Q(**{f'{field}__{lookup}': date})
+                | Q(**{field: date, f'pk__{lookup}': pk}))
+
+    def _key(self, row):
+        if isinstance(row, dict):
+            return row[self.date_field], row['id']
+        return getattr(row, self.date_field), row.pk
+
+    def _rows(self, key=None, backwards=False):
+        """per_page + 1 строк за ключом (date, pk); с `backwards` -
+        перед ним, в обратном порядке."""
+        queryset = self.object_list
+        if key is not None:
+            queryset = queryset.filter(
+                self._after(*key, 'gt' if backwards else 'lt')
+            )
+        if backwards:
+            queryset = queryset.reverse()
+        return list(queryset[:self.per_page + 1])
+
+    def _build_page(self, rows, number):
+        has_next = len(rows) > self.per_page
+        page = Page(rows[:self.per_page], number, self)
+        self._keyset_num_pages = number + int(has_next)
+        self._set_cursors(page)
+        return page
+
+    def _set_cursors(self, page):
+        page.next_cursor = page.previous_cursor = None
+        if not page.object_list:
+            return
+        if page.has_next():
+            last = page.object_list[len(page.object_list) - 1]
+            page.next_cursor = encode_cursor(
+                *self._key(last), page.number + 1
+            )
+        if page.has_previous():
+            first = page.object_list[0]
+            page.previous_cursor = encode_cursor(
+                *self._key(first), page.number - 1, backwards=True,
+            )
+
+
+class TimelinePaginator(CursorPaginator):
+    """Курсорный вывод ленты подписок (`timeline.Timeline`): порядок
+    задают источники ленты, строки выбирает `Timeline.fetch`."""
+
+    def order(self, object_list):
+        return object_list
+
+    def _rows(self, key=None, backwards=False):
+        return self.object_list.fetch(self.per_page + 1, key, backwards)
+
+
+class CommentPaginator(CursorPaginator):
+    """Комментарии поста от новых к старым по ключу (created, id)."""
+
+    date_field = 'created'
+
+
+def per_page(request, view):
+    """Постов на странице ленты `view`: из POSTS_PER_PAGE или из `?limit=`,
+    но не больше POSTS_MAX_PER_PAGE."""
+    size = settings.POSTS_PER_PAGE.get(view, settings.POSTS_PER_PAGE_DEFAULT)
+    try:
+        size = int(request.GET[LIMIT_PARAM])
+    except (KeyError, ValueError):
+        pass
+    return min(max(size, 1), settings.POSTS_MAX_PER_PAGE)
+
+
+def paginate(request, queryset, per_page, count=None, fragment=None,
+             paginator_class=CursorPaginator):
+    """Страница ленты постов для текущего запроса. С `fragment`
+    (`feed_cache.FeedCache`) строки и курсоры страницы хранятся в кеше
+    под ключом фрагмента ленты, и при попадании запрос ленты в базу
+    не идёт: ни для шаблона, ни для ссылки на следующую порцию."""
+    paginator = paginator_class(queryset, per_page, count=count)
+    if fragment is None:
+        return paginator.get_page_from_request(request)
+    digest = hashlib.md5(fragment.key.encode()).hexdigest()
+    state = get_or_set_coalesced(
+        f'feed-page:{digest}',
+        lambda: paginator.page_state(paginator.get_page_from_request(request)),
+        fragment.timeout,
+    )
+    return paginator.restore_page(state)
+
+
+def paginate_comments(request, queryset, per_page):
+    """Порция комментариев по курсору; первая - без курсора."""
+    token = request.GET.get(CURSOR_PARAM)
+    cursor = decode_cursor(token) if token else None
+    return CommentPaginator(queryset, per_page).get_cursor_page(cursor)
@@ -0,0 +1,51 @@
+"""Запросы для лент постов.
+
+Все ленты собираются из `feed_posts()`: автор и группа подтягиваются
+одним JOIN, колонки, которые шаблоны не выводят, откладываются,
+а число комментариев берётся из счётчика в строке поста.
+"""
+from .models import Post
+from .timeline import Timeline
+
+FEED_FIELDS = (
+    'text',
+    'text_html',
+    'markup_version',
+    'pub_date',
+    'image',
+    'thumbnails',
+    'comments_count',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group__title',
+    'group__slug',
+)
+
+
+def feed_posts(queryset=None):
+    """Посты, готовые к выводу карточками ленты."""
+    if queryset is None:
+        queryset = Post.objects.all()
+    return queryset.select_related('author', 'group').only(*FEED_FIELDS)
+
+
+def index_feed():
+    return feed_posts()
+
+
+def group_feed(group):
+    return feed_posts(Post.objects.filter(group=group))
+
+
+def profile_feed(author):
+    return feed_posts(Post.objects.filter(author=author))
+
+
+def follow_feed(user):
+    """Лента подписок для `TimelinePaginator`."""
+    return Timeline(user, feed_posts())
+
+
+def post_comments(post):
+    return post.comments.select_related('author')
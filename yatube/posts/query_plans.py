@@ -0,0 +1,78 @@
+"""Проверка планов SQL-запросов страниц.
+
+Страницы из `benchmark.scenarios` открываются тестовым клиентом, все
+их SELECT прогоняются через `EXPLAIN QUERY PLAN` (SQLite), и в плане
+ищутся полный проход по таблице и сортировка во временном B-дереве.
+"""
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from .benchmark import scenarios
+from .paginators import CURSOR_PARAM, PAGE_PARAM
+
+# Проход по таблице без индекса. SCAN ... USING INDEX - это чтение
+# в порядке индекса до LIMIT или COUNT по покрывающему индексу.
+FULL_SCAN_RE = re.compile(r'^SCAN (TABLE )?\S+( AS \S+)?$')
+TEMP_SORT_RE = re.compile(r'USE TEMP B-TREE FOR (RIGHT PART OF )?ORDER BY')
+# Чтение служебных таблиц SQLite (статистика для оценки числа строк).
+SYSTEM_TABLE_RE = re.compile(r'\bsqlite_(master|stat\d)\b')
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def problems(plan):
+    """Шаги плана с полным проходом или временной сортировкой."""
+    steps = (step.strip() for step in plan)
+    return [
+        step for step in steps
+        if FULL_SCAN_RE.match(step) or TEMP_SORT_RE.search(step)
+    ]
+
+
+def page_urls(client, url):
+    """Первая страница, следующая по курсору и вторая по номеру."""
+    urls = [url, f'{url}?{PAGE_PARAM}=2']
+    response = client.get(url)
+    page = response.context and response.context.get('page_obj')
+    cursor = getattr(page, 'next_cursor', None)
+    if cursor:
+        urls.append(f'{url}?{CURSOR_PARAM}={cursor}')
+    return urls
+
+
+def check(dataset):
+    """Список {'view', 'url', 'sql', 'plan', 'problems'} по всем
+    SELECT страниц. Кеш очищается, чтобы запросы дошли до базы."""
+    client = Client()
+    client.force_login(dataset.reader)
+    report = []
+    for name, method, url, _ in scenarios(dataset):
+        if method != 'get':
+            continue
+        for page_url in page_urls(client, url):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                client.get(page_url)
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                if SYSTEM_TABLE_RE.search(sql):
+                    continue
+                plan = explain(sql)
+                report.append({
+                    'view': name,
+                    'url': page_url,
+                    'sql': sql,
+                    'plan': plan,
+                    'problems': problems(plan),
+                })
+    return report
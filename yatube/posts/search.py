@@ -0,0 +1,145 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+Тексты разбиваются на термы (нижний регистр, ё -> е, грубое отсечение
+русских и английских окончаний) и складываются в таблицу SearchEntry.
+Поиск выбирает посты, в которых встретились все термы запроса, и
+ранжирует их по числу вхождений; совпадение в тексте поста весит
+больше совпадения в комментарии. Индекс обслуживается одинаково на
+SQLite и PostgreSQL и не требует расширений.
+"""
+import re
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Sum, When
+
+from .models import Comment, Post, SearchEntry
+
+POST_WEIGHT = 3
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = SearchEntry._meta.get_field('term').max_length
+MAX_QUERY_TERMS = 8
+BATCH_SIZE = 1000
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Окончания проверяются от длинных к коротким; основа не короче трёх букв.
+ENDINGS = sorted((
+    # русские
+    'ами', 'ями', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'иях', 'ах',
+    'ях', 'ов', 'ев', 'ей', 'ий', 'ый', 'ой', 'ая', 'яя', 'ое', 'ее',
+    'ые', 'ие', 'ам', 'ям', 'ом', 'ем', 'ть', 'ся', 'ла', 'ли', 'ло',
+    'а', 'я', 'ы', 'и', 'у', 'ю', 'е', 'о', 'ь',
+    # английские
+    'ing', 'ies', 'ed', 'es', 'ly', 's',
+), key=len, reverse=True)
+
+
+def stem(word):
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 3:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    """Термы текста в порядке появления (с повторами)."""
+    words = WORD_RE.findall(text.lower().replace('ё', 'е'))
+    return [
+        stem(word)[:MAX_TERM_LENGTH]
+        for word in words
+        if len(word) >= MIN_TERM_LENGTH and not word.isdigit()
+    ]
+
+
+def _entries(post_id, text, comment_id=None):
+    return [
+        SearchEntry(term=term, post_id=post_id, comment_id=comment_id,
+                    count=count)
+        for term, count in Counter(tokenize(text)).items()
+    ]
+
+
+@transaction.atomic
+def index_post(post):
+    SearchEntry.objects.filter(post=post, comment__isnull=True).delete()
+    SearchEntry.objects.bulk_create(_entries(post.pk, post.text))
+
+
+@transaction.atomic
+def index_comment(comment):
+    SearchEntry.objects.filter(comment=comment).delete()
+    SearchEntry.objects.bulk_create(
+        _entries(comment.post_id, comment.text, comment.pk)
+    )
+
+
+def index_documents(documents):
+    """Индексирует пачку строк (post_id, text[, comment_id]), заменяя
+    их прежние записи. Нужна массовой загрузке, которая идёт мимо
+    сигналов."""
+    documents = list(documents)
+    posts = [row[0] for row in documents if len(row) == 2]
+    comments = [row[2] for row in documents if len(row) == 3]
+    SearchEntry.objects.filter(
+        post_id__in=posts, comment__isnull=True
+    ).delete()
+    SearchEntry.objects.filter(comment_id__in=comments).delete()
+    SearchEntry.objects.bulk_create(
+        [entry for row in documents for entry in _entries(*row)],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def rebuild():
+    """Пересобирает индекс целиком. Возвращает число документов."""
+    SearchEntry.objects.all().delete()
+    documents = 0
+    batch = []
+    sources = (
+        Post.objects.values_list('pk', 'text'),
+        Comment.objects.values_list('post_id', 'text', 'pk'),
+    )
+    for source in sources:
+        for row in source.iterator(chunk_size=BATCH_SIZE):
+            batch.extend(_entries(*row))
+            documents += 1
+            if len(batch) >= BATCH_SIZE:
+                SearchEntry.objects.bulk_create(batch)
+                batch = []
+    SearchEntry.objects.bulk_create(batch)
+    return documents
+
+
+def query_terms(query):
+    return sorted(set(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+def ranked(query):
+    """Строки {'post_id', 'score'} по убыванию релевантности."""
+    terms = query_terms(query)
+    if not terms:
+        return SearchEntry.objects.none().values('post_id')
+    weight = Case(
+        When(comment__isnull=True, then=F('count') * POST_WEIGHT),
+        default=F('count'),
+        output_field=IntegerField(),
+    )
+    return SearchEntry.objects.filter(term__in=terms).values(
+        'post_id'
+    ).annotate(
+        score=Sum(weight),
+        matched=Count('term', distinct=True),
+    ).filter(matched=len(terms)).order_by('-score', '-post_id')
+
+
+def matching_comments(query):
+    """Id комментариев, в которых встретились все термы запроса."""
+    terms = query_terms(query)
+    if not terms:
+        return SearchEntry.objects.none().values('comment_id')
+    return SearchEntry.objects.filter(
+        term__in=terms, comment__isnull=False
+    ).values('comment_id').annotate(
+        matched=Count('term', distinct=True)
+    ).filter(matched=len(terms)).values('comment_id')
@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.tasks import enqueue
+
+from . import counters, feed_cache, follow_graph, tasks, timeline
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, update_fields=None, **kwargs):
+    # Запоминаем прежние группу и картинку: пост переносится между
+    # счётчиками групп, а для новой картинки готовятся превью.
+    instance._old_group_id = instance.group_id
+    instance._old_image = instance.image.name
+    tracked = {'group', 'image'}
+    if instance.pk and (update_fields is None or tracked & update_fields):
+        old = Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'image'
+        ).first()
+        if old is not None:
+            instance._old_group_id, instance._old_image = old
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, update_fields=None, **kwargs):
+    feed_cache.bump_post(instance)
+    if update_fields is None or 'text' in update_fields:
+        enqueue(tasks.index_post, instance.pk,
+                key=f'index_post:{instance.pk}')
+    old_image = getattr(instance, '_old_image', instance.image.name)
+    if (created and instance.image) or old_image != instance.image.name:
+        image_name = instance.image.name or ''
+        enqueue(tasks.generate_thumbnails, instance.pk, image_name,
+                key=f'thumbnails:{instance.pk}:{image_name}')
+    if created:
+        counters.bump_user(instance.author_id, 'posts_count', 1)
+        counters.bump_group(instance.group_id, 1)
+        enqueue(tasks.fan_out_post, instance.pk,
+                key=f'fan_out:{instance.pk}')
+        enqueue(tasks.notify_followers, instance.pk,
+                key=f'notify_post:{instance.pk}')
+        return
+    old_group_id = getattr(instance, '_old_group_id', instance.group_id)
+    if old_group_id != instance.group_id:
+        feed_cache.bump(f'group:{old_group_id}')
+        counters.bump_group(old_group_id, -1)
+        counters.bump_group(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    feed_cache.bump_post(instance)
+    counters.bump_user(instance.author_id, 'posts_count', -1)
+    counters.bump_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    enqueue(tasks.index_comment, instance.pk,
+            key=f'index_comment:{instance.pk}')
+    if created:
+        counters.bump_post(instance.post_id, 1)
+        feed_cache.bump_post(instance.post)
+        enqueue(tasks.notify_comment, instance.pk,
+                key=f'notify_comment:{instance.pk}')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, -1)
+    post = Post.objects.filter(pk=instance.post_id).first()
+    if post is not None:
+        feed_cache.bump_post(post)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, 'followers_count', 1)
+        counters.bump_user(instance.user_id, 'following_count', 1)
+        follow_graph.invalidate(instance.user_id, instance.author_id)
+        enqueue(tasks.backfill_timeline, instance.user_id,
+                instance.author_id,
+                key=f'backfill:{instance.user_id}:{instance.author_id}')
+        feed_cache.bump(f'timeline:{instance.user_id}')
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'followers_count', -1)
+    counters.bump_user(instance.user_id, 'following_count', -1)
+    follow_graph.invalidate(instance.user_id, instance.author_id)
+    timeline.prune(instance.user_id, instance.author_id)
+    if timeline.left_hot_set(instance.author_id):
+        enqueue(tasks.backfill_followers, instance.author_id,
+                key=f'backfill_followers:{instance.author_id}')
+    feed_cache.bump(f'timeline:{instance.user_id}')
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    feed_cache.bump('groups')
+    if not created:
+        feed_cache.bump('posts', f'group:{instance.pk}')
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Вход в систему обновляет только last_login, лент это не касается.
+    if not created and update_fields != frozenset(['last_login']):
+        feed_cache.bump('users')
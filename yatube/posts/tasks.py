@@ -0,0 +1,89 @@
+"""Фоновые задачи постов, комментариев и подписок.
+
+Задачи получают id и перечитывают объекты: к запуску объект мог
+измениться или исчезнуть, а задачи с одинаковым ключом схлопываются.
+"""
+from django.conf import settings
+
+from core.tasks import enqueue, task
+
+from . import (
+    feed_cache, markup, notifications, search, thumbnails, timeline,
+)
+from .models import Comment, Follow, Post
+
+
+@task
+def index_post(post_id):
+    post = Post.objects.only('text').filter(pk=post_id).first()
+    if post is not None:
+        search.index_post(post)
+
+
+@task
+def index_comment(comment_id):
+    comment = Comment.objects.only('post', 'text').filter(
+        pk=comment_id
+    ).first()
+    if comment is not None:
+        search.index_comment(comment)
+
+
+@task
+def fan_out_post(post_id):
+    post = Post.objects.only('author', 'pub_date').filter(pk=post_id).first()
+    if post is not None:
+        timeline.fan_out_post(post)
+        # Ленты подписок зависят от области posts.
+        feed_cache.bump('posts')
+
+
+@task
+def backfill_timeline(user_id, author_id):
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        timeline.backfill(user_id, author_id)
+        feed_cache.bump(f'timeline:{user_id}')
+
+
+@task
+def backfill_followers(author_id):
+    timeline.backfill_followers(author_id)
+    # Ленты подписок зависят от области posts.
+    feed_cache.bump('posts')
+
+
+@task
+def generate_thumbnails(post_id, image_name):
+    thumbnails.generate(post_id, image_name)
+
+
+@task
+def refresh_markup():
+    updated = markup.refresh(Post) + markup.refresh(Comment)
+    if updated:
+        # Закешированные фрагменты лент содержат прежний HTML.
+        feed_cache.bump('posts')
+
+
+@task
+def notify_followers(post_id):
+    if notifications.notify_followers(post_id):
+        schedule_digests()
+
+
+@task
+def notify_comment(comment_id):
+    if notifications.notify_comment(comment_id):
+        schedule_digests()
+
+
+@task
+def send_digests():
+    notifications.send_digests()
+
+
+def schedule_digests():
+    # Ожидающая рассылка с тем же ключом одна: события, пришедшие
+    # до её запуска, уйдут одним письмом.
+    enqueue(send_digests, key='send_digests',
+            delay=settings.NOTIFICATIONS_DIGEST_DELAY)
@@ -0,0 +1,62 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .. import benchmark
+from ..models import Post, TimelineEntry
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, TASKS_EAGER=True)
+class BenchmarkTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.dataset = benchmark.seed(
+            users=4, groups=2, posts=12, comments=6, follows=2,
+            image_ratio=0.5,
+        )
+
+    def test_seed_goes_through_signals(self):
+        """Синтетические данные заполняют ленты подписок и картинки."""
+        self.assertEqual(Post.objects.count(), 12)
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertTrue(Post.objects.exclude(image='').exists())
+
+    def test_run_reports_every_view(self):
+        """Отчёт есть для каждой страницы и содержит перцентили."""
+        results = benchmark.run(self.dataset, iterations=3, warmup=1)
+        self.assertEqual(
+            set(results), {name for name, *_ in benchmark.scenarios(
+                self.dataset
+            )}
+        )
+        for name, result in results.items():
+            with self.subTest(view=name):
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                self.assertGreater(result['queries']['max'], 0)
+                self.assertTrue(
+                    set(result['statuses']) <= {200, 302}
+                )
+        self.assertGreater(results['index']['bytes']['min'], 0)
+
+    def test_render_pages(self):
+        results = benchmark.render_pages(sizes=(5, 10), iterations=2,
+                                         warmup=0)
+        self.assertEqual(results[5]['posts'], 5)
+        self.assertEqual(results[10]['posts'], 10)
+        self.assertGreater(results[10]['p50_ms'], 0)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
@@ -0,0 +1,173 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from .. import bulk
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+from ..search import ranked
+
+User = get_user_model()
+
+
+class BulkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='bulk_author')
+        cls.reader = User.objects.create_user(username='bulk_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='bulk-group', description='Описание'
+        )
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def call(self, *args):
+        call_command(*args, stdout=StringIO())
+
+    def create_data(self):
+        post = Post.objects.create(
+            text='Слоны умеют плавать', author=self.author, group=self.group
+        )
+        Post.objects.create(text='Второй пост', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Правда?')
+        Follow.objects.create(user=self.reader, author=self.author)
+        return post
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка в обоих форматах сохраняют данные, а
+        счётчики, ленты и поиск восстанавливаются."""
+        post = self.create_data()
+        for fmt in bulk.FORMATS:
+            with self.subTest(format=fmt):
+                for kind in ('posts', 'comments', 'follows'):
+                    self.call('export_data', kind, self.path(f'{kind}.{fmt}'))
+                Post.objects.all().delete()
+                Follow.objects.all().delete()
+                for kind in ('posts', 'comments', 'follows'):
+                    self.call('import_data', kind, self.path(f'{kind}.{fmt}'))
+                restored = Post.objects.get(pk=post.pk)
+                self.assertEqual(restored.pub_date, post.pub_date)
+                self.assertEqual(restored.group, self.group)
+                self.assertEqual(restored.comments_count, 1)
+                self.assertEqual(Post.objects.count(), 2)
+                self.assertTrue(TimelineEntry.objects.filter(
+                    user=self.reader, post=post
+                ).exists())
+                self.assertEqual(
+                    [row['post_id'] for row in ranked('слон')], [post.pk]
+                )
+                self.group.refresh_from_db()
+                self.assertEqual(self.group.posts_count, 1)
+
+    def test_missing_users_are_skipped_or_created(self):
+        path = self.path('posts.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps({
+                'id': 500, 'author': 'newcomer', 'group': 'new-group',
+                'text': 'Привет', 'pub_date': '2022-01-01T00:00:00+00:00',
+                'image': '',
+            }) + '\n')
+        stats = bulk.import_file('posts', path, 'jsonl')
+        self.assertEqual(stats.skipped, 1)
+        self.assertFalse(Post.objects.exists())
+        bulk.import_file('posts', path, 'jsonl', create_missing=True)
+        self.assertEqual(
+            Post.objects.get(pk=500).author.username, 'newcomer'
+        )
+
+    def test_taken_ids_are_reported_as_conflicts(self):
+        """Строка с занятым id не заменяет существующий пост, а после
+        загрузки новые посты получают свободные id."""
+        post = Post.objects.create(text='Старый пост', author=self.author)
+        path = self.path('posts.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            for pk, text in ((post.pk, 'Чужой пост'), (900, 'Новый пост')):
+                file.write(json.dumps({
+                    'id': pk, 'author': self.author.username,
+                    'group': None, 'text': text, 'pub_date': None,
+                    'image': '',
+                }) + '\n')
+        stats = bulk.import_file('posts', path, 'jsonl')
+        bulk.finish(['posts'])
+        self.assertEqual(stats.conflicts, 1)
+        self.assertEqual(stats.skipped, 0)
+        self.assertEqual(Post.objects.get(pk=post.pk).text, 'Старый пост')
+        created = Post.objects.create(text='После загрузки',
+                                      author=self.author)
+        self.assertGreater(created.pk, 900)
+
+    def test_bad_rows_stop_import_with_line_number(self):
+        """Битый JSON, пропущенная колонка и нечисловой id дают ошибку
+        команды с номером строки, а не трассировку."""
+        good = json.dumps({
+            'id': 700, 'author': self.author.username, 'group': None,
+            'text': 'Пост', 'pub_date': None, 'image': '',
+        })
+        bad_lines = [
+            '{битая строка',
+            json.dumps({'id': 701, 'text': 'Без автора'}),
+            json.dumps({'id': 'x', 'author': self.author.username,
+                        'text': 'Пост'}),
+        ]
+        for bad in bad_lines:
+            with self.subTest(line=bad):
+                path = self.path('posts.jsonl')
+                with open(path, 'w', encoding='utf-8') as file:
+                    file.write(f'{good}\n{bad}\n')
+                with self.assertRaisesMessage(CommandError, 'Строка 2'):
+                    self.call('import_data', 'posts', path, '--restart')
+
+    def test_self_follow_is_skipped(self):
+        path = self.path('follows.csv')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('user,author\n')
+            file.write(f'{self.reader.username},{self.reader.username}\n')
+            file.write(f'{self.reader.username},{self.author.username}\n')
+        stats = bulk.import_file('follows', path, 'csv')
+        self.assertEqual(stats.skipped, 1)
+        self.assertFalse(Follow.objects.filter(
+            user=self.reader, author=self.reader
+        ).exists())
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author
+        ).exists())
+
+    def test_resume_from_checkpoint(self):
+        """После сбоя загрузка продолжается с первой незагруженной пачки."""
+        path = self.path('posts.jsonl')
+        lines = [
+            json.dumps({
+                'id': 600 + i, 'author': self.author.username, 'group': None,
+                'text': f'Пост {i}', 'pub_date': None, 'image': '',
+            })
+            for i in range(5)
+        ]
+        lines[3] = '{битая строка'
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+        with self.assertRaises(ValueError):
+            bulk.import_file('posts', path, 'jsonl', batch_size=2)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(bulk.load_checkpoint(bulk.checkpoint_path(path)), 2)
+
+        lines[3] = json.dumps({
+            'id': 603, 'author': self.author.username, 'group': None,
+            'text': 'Пост 3', 'pub_date': None, 'image': '',
+        })
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+        stats = bulk.import_file('posts', path, 'jsonl', batch_size=2)
+        self.assertEqual(stats.processed, 3)
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertFalse(os.path.exists(bulk.checkpoint_path(path)))
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import markup
+from ..models import Comment, Post
+
+User = get_user_model()
+
+PER_PAGE = settings.COMMENTS_PER_PAGE
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='commenter')
+        cls.post = Post.objects.create(text='Популярный', author=cls.author)
+        cls.quiet_post = Post.objects.create(text='Тихий', author=cls.author)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.author, text=f'Ответ {i}')
+            for i in range(PER_PAGE + 5)
+        )
+        # bulk_create не рисует HTML текстов, как и массовая загрузка.
+        markup.refresh(Comment)
+        Comment.objects.create(
+            post=cls.quiet_post, author=cls.author, text='Единственный'
+        )
+        cls.detail_url = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.list_url = reverse('posts:comment_list', args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_post_page_shows_first_portion(self):
+        """На странице поста только первая порция, новые сверху."""
+        response = self.client.get(self.detail_url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments.object_list), PER_PAGE)
+        self.assertEqual(comments[0].text, f'Ответ {PER_PAGE + 4}')
+        self.assertContains(response, 'data-comments-more')
+
+    def test_first_paint_does_not_depend_on_comment_count(self):
+        """Число запросов одинаково для поста с 1 и с 25 комментариями."""
+        quiet_url = reverse('posts:post_detail', args=[self.quiet_post.pk])
+        with self.assertNumQueries(3):
+            self.client.get(quiet_url)
+        cache.clear()
+        with self.assertNumQueries(3):
+            self.client.get(self.detail_url)
+
+    def test_load_more_fragment(self):
+        """Фрагмент по курсору продолжает список без повторов."""
+        first = self.client.get(self.detail_url).context['comments']
+        response = self.client.get(
+            self.list_url, {'cursor': first.next_cursor}
+        )
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        rest = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in rest],
+            [f'Ответ {i}' for i in range(4, -1, -1)],
+        )
+        self.assertNotContains(response, 'data-comments-more')
+
+    def test_load_more_json(self):
+        """С ?format=json порция отдаётся в JSON с курсором дальше."""
+        data = self.client.get(self.list_url, {'format': 'json'}).json()
+        self.assertEqual(len(data['comments']), PER_PAGE)
+        self.assertEqual(data['comments'][0]['author'], 'commenter')
+        data = self.client.get(self.list_url, {
+            'format': 'json', 'cursor': data['next_cursor'],
+        }).json()
+        self.assertEqual(len(data['comments']), 5)
+        self.assertIsNone(data['next_cursor'])
+
+    def test_bad_cursor_starts_from_newest(self):
+        response = self.client.get(self.list_url, {'cursor': 'мусор'})
+        self.assertEqual(
+            response.context['comments'][0].text, f'Ответ {PER_PAGE + 4}'
+        )
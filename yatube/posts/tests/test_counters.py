@@ -0,0 +1,109 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='counted_author')
+        cls.reader = User.objects.create_user(username='counted_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='counted-group', description='Описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая', slug='other-group', description='Описание'
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_create_and_delete_update_counters(self):
+        """Публикация и удаление поста меняют счётчики автора и группы."""
+        self.client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост', 'group': self.group.pk},
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        Post.objects.get(author=self.author).delete()
+        self.group.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.group.posts_count, 0)
+
+    def test_post_edit_moves_post_between_groups(self):
+        """Смена группы переносит пост между счётчиками групп."""
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        self.client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            data={'text': 'Пост', 'group': self.other_group.pk},
+        )
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+    def test_comment_and_follow_counters(self):
+        """Комментарии и подписки меняют свои счётчики."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Да')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_profile_reads_counter(self):
+        """Профиль показывает число постов из счётчика."""
+        Post.objects.create(text='Пост', author=self.author)
+        UserStats.objects.filter(user=self.author).update(posts_count=42)
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertEqual(response.context['posts_count'], 42)
+
+    def test_reconcile_fixes_drift(self):
+        """Команда reconcile_counters исправляет разошедшиеся счётчики."""
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        UserStats.objects.all().delete()
+        Group.objects.update(posts_count=7)
+        Post.objects.update(comments_count=3)
+        call_command('reconcile_counters', stdout=StringIO())
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(post.comments_count, 0)
+
+    def test_deleting_user_with_posts_and_follows(self):
+        """Удаление автора с постами и подписками не восстанавливает его
+        UserStats посреди каскада."""
+        author = User.objects.create_user(username='leaving_author')
+        Post.objects.create(text='Пост', author=author, group=self.group)
+        Follow.objects.create(user=author, author=self.reader)
+        Follow.objects.create(user=self.reader, author=author)
+        author.delete()
+        self.assertFalse(User.objects.filter(pk=author.pk).exists())
+        self.assertFalse(UserStats.objects.filter(user_id=author.pk).exists())
+        self.assertEqual(self.stats(self.reader).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
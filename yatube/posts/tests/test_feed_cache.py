@@ -0,0 +1,132 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from .. import feed_cache
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='cached_author')
+        cls.other_author = User.objects.create_user(username='other_author')
+        cls.reader = User.objects.create_user(username='cached_reader')
+        cls.other_reader = User.objects.create_user(username='other_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='cached-group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Первый текст', author=cls.author, group=cls.group
+        )
+        cls.other_post = Post.objects.create(
+            text='Чужой текст', author=cls.other_author
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.other_reader, author=cls.other_author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_follow_feed_is_not_shared_between_viewers(self):
+        """Лента подписок одного пользователя не достаётся другому."""
+        self.client.get(reverse('posts:follow_index'))
+        other_client = Client()
+        other_client.force_login(self.other_reader)
+        response = other_client.get(reverse('posts:follow_index'))
+        self.assertContains(response, self.other_post.text)
+        self.assertNotContains(response, self.post.text)
+
+    def test_feeds_are_served_from_cache(self):
+        """Изменение в обход моделей не видно, пока фрагмент в кеше."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            self.client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Первый текст')
+
+    def test_post_save_invalidates_feeds(self):
+        """Сохранение поста сбрасывает все ленты, где он выводится."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            self.client.get(url)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Новый текст')
+
+    def test_comment_and_follow_invalidate_feeds(self):
+        """Комментарий и подписка сбрасывают зависящие от них ленты."""
+        self.client.get(reverse('posts:index'))
+        Comment.objects.create(post=self.post, author=self.reader, text='Да')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Комментариев: 1')
+        self.client.get(reverse('posts:follow_index'))
+        self.client.get(reverse(
+            'posts:profile_follow', args=[self.other_author.username]
+        ))
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertContains(response, self.other_post.text)
+
+    def test_pages_are_cached_separately(self):
+        """Разные страницы ленты кешируются под разными ключами."""
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=self.author) for i in range(12)
+        )
+        cache.clear()
+        first = self.client.get(reverse('posts:index'))
+        second = self.client.get(
+            reverse('posts:index'),
+            {'cursor': first.context['page_obj'].next_cursor},
+        )
+        self.assertNotEqual(first.content, second.content)
+
+    def test_cached_page_skips_feed_query(self):
+        """При попадании в кеш страница ленты не запрашивает посты:
+        строки и курсоры лежат рядом с фрагментом."""
+        client = Client()
+        first = client.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            response = client.get(reverse('posts:index'))
+        self.assertContains(response, self.post.text)
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [post.pk for post in first.context['page_obj']],
+        )
+
+
+class FeedCacheCommitTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='commit_author')
+
+    def test_key_cached_before_commit_is_not_read(self):
+        """Ключ, под которым параллельный запрос мог сохранить ленту
+        до коммита, после коммита уже не читается."""
+        client = Client()
+        with transaction.atomic():
+            Post.objects.create(text='Пост в транзакции', author=self.author)
+            during = feed_cache.generations(['posts'])
+        self.assertNotEqual(feed_cache.generations(['posts']), during)
+        self.assertContains(client.get(reverse('posts:index')),
+                            'Пост в транзакции')
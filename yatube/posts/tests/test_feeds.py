@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class SyndicationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='feed_author')
+        cls.group = Group.objects.create(
+            title='Новости', slug='feed-news', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост для подписчиков RSS', author=cls.author,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def urls(self):
+        return [
+            reverse('posts:index_rss'),
+            reverse('posts:index_atom'),
+            reverse('posts:group_rss', args=[self.group.slug]),
+            reverse('posts:group_atom', args=[self.group.slug]),
+            reverse('posts:profile_rss', args=[self.author.username]),
+            reverse('posts:profile_atom', args=[self.author.username]),
+        ]
+
+    def test_feeds_list_posts(self):
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('xml', response['Content-Type'])
+                self.assertContains(response, 'Пост для подписчиков RSS')
+                self.assertContains(response, f'/posts/{self.post.pk}/')
+
+    def test_unknown_group_or_author(self):
+        for name, arg in (('posts:group_rss', 'missing'),
+                          ('posts:profile_atom', 'missing')):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, args=[arg]))
+                self.assertEqual(response.status_code, 404)
+
+    def test_not_modified_until_post_saved(self):
+        url = reverse('posts:group_rss', args=[self.group.slug])
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            # Остаётся только поиск группы по slug.
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(
+            text='Совсем новый пост', author=self.author, group=self.group
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Совсем новый пост')
+
+    def test_xml_is_served_from_cache(self):
+        url = reverse('posts:index_rss')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, 'Пост для подписчиков RSS')
+
+    def test_links_follow_host_and_scheme(self):
+        """Закешированный XML одного хоста не отдаётся другому."""
+        url = reverse('posts:index_rss')
+        self.client.get(url, HTTP_HOST='localhost')
+        response = self.client.get(url, HTTP_HOST='127.0.0.1', secure=True)
+        self.assertContains(response, 'https://127.0.0.1/')
+        self.assertNotContains(response, 'localhost')
+
+    def test_pages_link_to_feeds(self):
+        response = self.client.get(
+            reverse('posts:group_list', args=[self.group.slug])
+        )
+        self.assertContains(
+            response, reverse('posts:group_atom', args=[self.group.slug])
+        )
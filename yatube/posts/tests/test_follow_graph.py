@@ -0,0 +1,151 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+
+from .. import follow_graph
+from ..models import Follow
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader, cls.alice, cls.bob, cls.carol, cls.dave = [
+            User.objects.create_user(username=name)
+            for name in ('reader', 'alice', 'bob', 'carol', 'dave')
+        ]
+        # reader -> alice, bob; оба подписаны на carol, только bob - на dave.
+        for user, author in [
+            (cls.reader, cls.alice), (cls.reader, cls.bob),
+            (cls.alice, cls.carol), (cls.bob, cls.carol),
+            (cls.bob, cls.dave), (cls.bob, cls.reader),
+        ]:
+            Follow.objects.create(user=user, author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_sets_are_sorted_and_cached(self):
+        expected = sorted([self.alice.pk, self.bob.pk])
+        self.assertEqual(list(follow_graph.following(self.reader.pk)),
+                         expected)
+        self.assertEqual(
+            sorted(follow_graph.followers(self.carol.pk)),
+            list(follow_graph.followers(self.carol.pk)),
+        )
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                follow_graph.is_following(self.reader.pk, self.alice.pk)
+            )
+            self.assertFalse(
+                follow_graph.is_following(self.reader.pk, self.carol.pk)
+            )
+            self.assertFalse(follow_graph.is_following(None, self.alice.pk))
+
+    @override_settings(FOLLOW_GRAPH_MAX_IDS=1)
+    def test_long_list_is_checked_with_exists(self):
+        """Список длиннее лимита читается не целиком, а проверка
+        подписки идёт одним запросом."""
+        with self.assertNumQueries(2):
+            self.assertTrue(
+                follow_graph.is_following(self.bob.pk, self.dave.pk)
+            )
+        with self.assertNumQueries(1):
+            self.assertFalse(
+                follow_graph.is_following(self.bob.pk, self.alice.pk)
+            )
+        self.assertEqual(
+            list(follow_graph.following(self.bob.pk)),
+            sorted([self.carol.pk, self.dave.pk, self.reader.pk]),
+        )
+
+    def test_follow_and_unfollow_invalidate_sets(self):
+        self.assertFalse(
+            follow_graph.is_following(self.reader.pk, self.dave.pk)
+        )
+        self.assertNotIn(self.reader.pk, follow_graph.followers(self.dave.pk))
+        follow = Follow.objects.create(user=self.reader, author=self.dave)
+        self.assertTrue(
+            follow_graph.is_following(self.reader.pk, self.dave.pk)
+        )
+        self.assertIn(self.reader.pk, follow_graph.followers(self.dave.pk))
+        follow.delete()
+        self.assertFalse(
+            follow_graph.is_following(self.reader.pk, self.dave.pk)
+        )
+
+    def test_friends_of_friends_ranked_by_overlap(self):
+        """carol (две общие связи) выше dave (одна); сам пользователь
+        и его авторы в рекомендации не попадают."""
+        suggestions = follow_graph.compute_suggestions([self.reader.pk])
+        self.assertEqual(
+            suggestions[self.reader.pk], [self.carol.pk, self.dave.pk]
+        )
+
+    def test_batch_job_feeds_pages(self):
+        out = StringIO()
+        call_command('refresh_follow_suggestions', stdout=out)
+        self.assertIn('Рекомендации обновлены', out.getvalue())
+        client = Client()
+        client.force_login(self.reader)
+        for url in (reverse('posts:follow_index'),
+                    reverse('posts:profile', args=[self.alice.username])):
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertEqual(
+                    response.context['suggestions'], [self.carol, self.dave]
+                )
+                self.assertContains(response, 'Вам могут понравиться')
+        # Уже выбранный автор пропадает из блока без пересчёта.
+        Follow.objects.create(user=self.reader, author=self.carol)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['suggestions'], [self.dave])
+
+    def test_profile_follow_state_comes_from_graph(self):
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:profile', args=[self.alice.username])
+        self.assertTrue(client.get(url).context['following'])
+        url = reverse('posts:profile', args=[self.carol.username])
+        self.assertFalse(client.get(url).context['following'])
+        self.assertEqual(client.get(url).context['suggestions'], [])
+
+
+class FollowGraphCommitTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='committer')
+        self.author = User.objects.create_user(username='committed')
+
+    def stale(self, ids):
+        """Состояние, которое положил в кеш параллельный запрос."""
+        cache.set(
+            follow_graph.KEY.format(follow_graph.FOLLOWING, self.reader.pk),
+            follow_graph._pack(ids), None,
+        )
+
+    def test_state_cached_before_commit_is_dropped(self):
+        with transaction.atomic():
+            Follow.objects.create(user=self.reader, author=self.author)
+            self.stale([])
+        self.assertTrue(
+            follow_graph.is_following(self.reader.pk, self.author.pk)
+        )
+
+    def test_follow_is_written_even_if_graph_is_stale(self):
+        self.stale([self.author.pk])
+        client = Client()
+        client.force_login(self.reader)
+        client.get(reverse('posts:profile_follow', args=['committed']))
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author
+        ).exists())
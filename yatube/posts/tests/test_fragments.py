@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils.html import escape
+
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(
+    POSTS_PER_PAGE={'index': 4, 'group_list': 3, 'profile': 5},
+    POSTS_MAX_PER_PAGE=6,
+)
+class FeedFragmentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='scroller')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Прокрутка', slug='scroll', description='Лента'
+        )
+        for i in range(9):
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def walk(self, url):
+        """Проходит ленту по фрагментам, возвращает тексты постов."""
+        texts = []
+        while url:
+            response = self.client.get(url)
+            self.assertTemplateNotUsed(response, 'base.html')
+            texts.extend(post.text for post in response.context['page_obj'])
+            url = response.context['next_fragment_url']
+        return texts
+
+    def test_page_size_comes_from_settings(self):
+        cases = {
+            reverse('posts:index'): 4,
+            reverse('posts:group_list', args=[self.group.slug]): 3,
+            reverse('posts:profile', args=[self.author.username]): 5,
+        }
+        for url, size in cases.items():
+            with self.subTest(url=url):
+                page_obj = self.client.get(url).context['page_obj']
+                self.assertEqual(len(page_obj), size)
+
+    def test_limit_is_capped(self):
+        url = reverse('posts:index')
+        page_obj = self.client.get(url, {'limit': 2}).context['page_obj']
+        self.assertEqual(len(page_obj), 2)
+        page_obj = self.client.get(url, {'limit': 1000}).context['page_obj']
+        self.assertEqual(len(page_obj), 6)
+
+    def test_fragments_continue_the_page(self):
+        """Страница и её фрагменты вместе дают всю ленту без повторов."""
+        expected = [f'Пост {i}' for i in range(8, -1, -1)]
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                texts = [post.text for post in response.context['page_obj']]
+                texts += self.walk(response.context['next_fragment_url'])
+                self.assertEqual(texts, expected)
+
+    def test_follow_fragment(self):
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('posts:follow_index'))
+        texts = [post.text for post in response.context['page_obj']]
+        texts += self.walk(response.context['next_fragment_url'])
+        self.assertEqual(len(texts), 9)
+
+    def test_prefetch_hints(self):
+        response = self.client.get(reverse('posts:index'), {'limit': 3})
+        next_url = response.context['next_fragment_url']
+        self.assertTrue(next_url.startswith(reverse('posts:index_fragment')))
+        self.assertIn('limit=3', next_url)
+        self.assertEqual(response['Link'], f'<{next_url}>; rel=prefetch')
+        self.assertContains(
+            response, f'<link rel="prefetch" href="{escape(next_url)}">'
+        )
+        self.assertContains(response, 'data-posts-more')
+        last = self.client.get(reverse('posts:index'), {'limit': 6})
+        last = self.client.get(last.context['next_fragment_url'])
+        self.assertFalse(last.has_header('Link'))
+        self.assertNotContains(last, 'data-posts-more')
+
+    def test_fragment_supports_conditional_get(self):
+        url = reverse('posts:index_fragment')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_objects(self):
+        self.assertEqual(self.client.get(
+            reverse('posts:group_fragment', args=['nope'])
+        ).status_code, 404)
+        self.assertEqual(self.client.get(
+            reverse('posts:profile_fragment', args=['nobody'])
+        ).status_code, 404)
@@ -0,0 +1,143 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='etag_author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='etag-group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Текст поста', author=cls.author, group=cls.group
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[cls.group.slug]),
+            reverse('posts:profile', args=[cls.author.username]),
+            reverse('posts:post_detail', args=[cls.post.pk]),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_pages_return_not_modified(self):
+        """Повторный запрос с тем же ETag получает 304 без тела."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                with self.assertNumQueries(1 if url != self.urls[0] else 0):
+                    repeated = self.revalidate(url, response)
+                self.assertEqual(repeated.status_code, 304)
+                self.assertEqual(repeated.content, b'')
+
+    def test_if_modified_since(self):
+        """Last-Modified принимается в If-Modified-Since."""
+        url = self.urls[0]
+        response = self.client.get(url)
+        repeated = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(repeated.status_code, 304)
+        stale = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE='Mon, 01 Jan 2001 00:00:00 GMT'
+        )
+        self.assertEqual(stale.status_code, 200)
+
+    def test_changes_produce_new_etag(self):
+        """Правка поста и новый комментарий меняют ETag страниц."""
+        responses = {url: self.client.get(url) for url in self.urls}
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url, response).status_code,
+                                 200)
+        detail_url = self.urls[-1]
+        response = self.client.get(detail_url)
+        Comment.objects.create(post=self.post, author=self.author, text='Да')
+        self.assertContains(self.revalidate(detail_url, response), 'Да')
+
+    def test_etag_depends_on_viewer(self):
+        """Вход в систему меняет ETag и делает страницу частной."""
+        url = self.urls[0]
+        anonymous = self.client.get(url)
+        self.assertIn('public', anonymous['Cache-Control'])
+        self.assertIn('s-maxage', anonymous['Cache-Control'])
+        self.assertIn('Cookie', anonymous['Vary'])
+        self.client.force_login(self.author)
+        response = self.revalidate(url, anonymous)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_etag_depends_on_csrf_cookie(self):
+        """После нового входа страница с формой и прежним CSRF-токеном
+        не подтверждается ответом 304."""
+        url = self.urls[-1]
+        self.client.force_login(self.author)
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 64
+        response = self.client.get(url)
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'b' * 64
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_missing_object_is_not_cached(self):
+        """Для несуществующих объектов заголовки не выставляются."""
+        response = self.client.get(reverse('posts:post_detail', args=[999]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+    @override_settings(PAGE_ETAGS=False)
+    def test_no_validators_without_shared_cache(self):
+        """Без общего кеша поколения воркеров расходятся, поэтому ни
+        ETag, ни 304 страницы и ленты не отдают."""
+        for url in [*self.urls, reverse('posts:index_rss')]:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.has_header('ETag'))
+                self.assertFalse(response.has_header('Last-Modified'))
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }})
+    def test_works_without_cache(self):
+        """Страницы отдаются и с кешем, который ничего не хранит."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.has_header('ETag'))
+
+
+class ConditionalGetCommitTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='etag_committer')
+
+    def test_etag_issued_before_commit_is_not_reused(self):
+        """ETag, выданный вместе со страницей до коммита записи, после
+        коммита не даёт 304."""
+        client = Client()
+        url = reverse('posts:index')
+        with transaction.atomic():
+            Post.objects.create(text='Пост в транзакции', author=self.author)
+            etag = client.get(url)['ETag']
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import markup
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class MarkupTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='markup_author')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_render(self):
+        html = markup.render(
+            '**Жирный** и *курсив*, `код`\n'
+            'https://example.com/a?b=1&c=2.\n\n'
+            '@markup_author и @nobody <script>alert(1)</script>'
+        )
+        self.assertIn('<strong>Жирный</strong>', html)
+        self.assertIn('<em>курсив</em>', html)
+        self.assertIn('<code>код</code>', html)
+        self.assertIn(
+            '<a href="https://example.com/a?b=1&amp;c=2" '
+            'rel="nofollow noopener" target="_blank">', html
+        )
+        self.assertIn('</a>.</p>', html)
+        profile = reverse('posts:profile', args=['markup_author'])
+        self.assertIn(f'<a href="{profile}">@markup_author</a>', html)
+        self.assertIn('@nobody', html)
+        self.assertNotIn('<script>', html)
+        self.assertIn('&lt;script&gt;', html)
+        self.assertEqual(html.count('<p>'), 2)
+
+    def test_quotes_end_links(self):
+        html = markup.render('"https://example.com"', users=frozenset())
+        self.assertIn('href="https://example.com"', html)
+
+    def test_html_is_rendered_on_save(self):
+        post = Post.objects.create(text='**Новость**', author=self.author)
+        self.assertEqual(post.markup_version, markup.VERSION)
+        self.assertIn('<strong>', post.text_html)
+        post.text = '*Правка*'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertIn('<em>Правка</em>', post.text_html)
+        comment = Comment.objects.create(
+            post=post, author=self.author, text='`ok`'
+        )
+        self.assertIn('<code>ok</code>', comment.text_html)
+
+    def test_feed_outputs_stored_html(self):
+        Post.objects.create(text='Смотрите https://example.com',
+                            author=self.author)
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, 'href="https://example.com"')
+
+    @override_settings(TASKS_EAGER=True)
+    def test_stale_rows_are_refreshed_in_bulk(self):
+        """Строки старой версии выводятся сразу, а пересчитываются
+        фоновой задачей."""
+        post = Post.objects.create(text='**Старое**', author=self.author)
+        Comment.objects.create(post=post, author=self.author, text='*к*')
+        Post.objects.update(text_html='устаревший', markup_version=0)
+        Comment.objects.update(markup_version=0)
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, '<strong>Старое</strong>')
+        self.assertNotContains(response, 'устаревший')
+        post.refresh_from_db()
+        self.assertEqual(post.markup_version, markup.VERSION)
+        self.assertFalse(
+            Comment.objects.exclude(markup_version=markup.VERSION).exists()
+        )
@@ -0,0 +1,88 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core import tasks
+from core.models import Task
+
+from .. import notifications
+from ..models import Comment, Follow, Notification, Post
+
+User = get_user_model()
+
+
+@override_settings(TASKS_EAGER=False)
+class NotificationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='notify_author', email='author@yatube.ru'
+        )
+        cls.reader = User.objects.create_user(
+            username='notify_reader', email='reader@yatube.ru'
+        )
+        cls.silent = User.objects.create_user(username='notify_silent')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.silent, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        tasks.run_pending()
+
+    def test_events_are_sent_as_one_digest(self):
+        """Два поста и комментарий - по одному письму каждому адресату,
+        а рассылка ждёт, пока накопятся события."""
+        first = Post.objects.create(text='Первый пост', author=self.author)
+        Post.objects.create(text='Второй пост', author=self.author)
+        Comment.objects.create(post=first, author=self.reader, text='Ура')
+        Comment.objects.create(post=first, author=self.author, text='Свой')
+        tasks.run_pending()
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            Task.objects.filter(key='send_digests').count(), 1
+        )
+
+        self.assertEqual(notifications.send_digests(), 2)
+        letters = {letter.to[0]: letter.body for letter in mail.outbox}
+        self.assertEqual(set(letters), {'reader@yatube.ru',
+                                        'author@yatube.ru'})
+        self.assertIn('Первый пост', letters['reader@yatube.ru'])
+        self.assertIn('Второй пост', letters['reader@yatube.ru'])
+        self.assertIn(f'/posts/{first.pk}/', letters['reader@yatube.ru'])
+        self.assertIn('Ура', letters['author@yatube.ru'])
+        self.assertNotIn('Свой', letters['author@yatube.ru'])
+        self.assertEqual(notifications.send_digests(), 0)
+
+    def test_one_connection_per_batch(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Ага')
+        tasks.run_pending()
+        with mock.patch.object(
+            mail, 'get_connection', wraps=mail.get_connection
+        ) as get_connection:
+            self.assertEqual(notifications.send_digests(batch_size=1), 2)
+        self.assertEqual(get_connection.call_count, 2)
+
+    @override_settings(NOTIFICATIONS_RATE_LIMIT=(2, 60 * 60))
+    def test_busy_author_is_rate_limited(self):
+        for number in range(4):
+            Post.objects.create(text=f'Пост {number}', author=self.author)
+        tasks.run_pending()
+        self.assertEqual(
+            Notification.objects.filter(recipient=self.reader).count(), 2
+        )
+
+    @override_settings(NOTIFICATIONS_DIGEST_ITEMS=1)
+    def test_digest_mentions_hidden_events(self):
+        Post.objects.create(text='Показан', author=self.author)
+        Post.objects.create(text='Скрыт', author=self.author)
+        tasks.run_pending()
+        notifications.send_digests()
+        body = mail.outbox[0].body
+        self.assertIn('Показан', body)
+        self.assertNotIn('Скрыт', body)
+        self.assertIn('И ещё событий: 1', body)
@@ -0,0 +1,206 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+from ..paginators import (
+    CountedPaginator, decode_cursor, encode_cursor, estimated_rows,
+)
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='paginator_author')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.user) for i in range(25)
+        )
+        cls.index_url = reverse('posts:index')
+
+    def setUp(self):
+        self.client = Client()
+
+    def walk(self):
+        """Проходит ленту по курсорам и возвращает id постов."""
+        seen = []
+        response = self.client.get(self.index_url)
+        while True:
+            page_obj = response.context['page_obj']
+            seen.extend(post.pk for post in page_obj)
+            if not page_obj.has_next():
+                return seen, page_obj
+            response = self.client.get(
+                self.index_url, {'cursor': page_obj.next_cursor}
+            )
+
+    def test_cursor_walk_returns_every_post_once(self):
+        """Курсоры обходят всю ленту без пропусков и повторов."""
+        seen, last_page = self.walk()
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True)
+        )
+        self.assertEqual(seen, expected)
+        self.assertEqual(last_page.number, 3)
+        self.assertEqual(len(last_page), 5)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор назад возвращает предыдущую страницу."""
+        first = self.client.get(self.index_url).context['page_obj']
+        second = self.client.get(
+            self.index_url, {'cursor': first.next_cursor}
+        ).context['page_obj']
+        back = self.client.get(
+            self.index_url, {'cursor': second.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            [post.pk for post in back], [post.pk for post in first]
+        )
+        self.assertFalse(back.has_previous())
+
+    def test_deep_page_does_not_count(self):
+        """Страница по курсору не выполняет COUNT(*)."""
+        first = self.client.get(self.index_url).context['page_obj']
+        with self.assertNumQueries(1):
+            page_obj = first.paginator.get_cursor_page(
+                decode_cursor(first.next_cursor)
+            )
+            list(page_obj)
+
+    def test_old_page_links_still_work(self):
+        """Старые ссылки `?page=N` открывают ту же страницу."""
+        response = self.client.get(self.index_url, {'page': 2})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.number, 2)
+        self.assertEqual(len(page_obj), 10)
+        self.assertIsNotNone(page_obj.next_cursor)
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        """Повреждённый курсор открывает первую страницу."""
+        response = self.client.get(self.index_url, {'cursor': '%%%'})
+        self.assertEqual(response.context['page_obj'].number, 1)
+        self.assertIsNone(decode_cursor('bm90LWpzb24'))
+
+    def test_out_of_range_cursor_falls_back_to_first_page(self):
+        """Числа за пределами BIGINT и дата без часового пояса
+        не доходят до базы."""
+        post = Post.objects.first()
+        naive = post.pub_date.replace(tzinfo=None)
+        tokens = [
+            encode_cursor(post.pub_date, 10 ** 30, 2),
+            encode_cursor(post.pub_date, post.pk, 10 ** 30),
+            encode_cursor(post.pub_date, -10 ** 30, 2, backwards=True),
+            encode_cursor(naive, post.pk, 2),
+        ]
+        for token in tokens:
+            with self.subTest(token=token):
+                self.assertIsNone(decode_cursor(token))
+                response = self.client.get(self.index_url, {'cursor': token})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['page_obj'].number, 1)
+        self.assertIsNotNone(decode_cursor(
+            encode_cursor(post.pub_date, 2 ** 63 - 1, 2)
+        ))
+
+
+class CountedPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='counted_author')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.user) for i in range(30)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_cached(self):
+        """COUNT(*) выполняется один раз за PAGINATOR_COUNT_TIMEOUT."""
+        queryset = Post.objects.filter(author=self.user).order_by('pk')
+        with self.assertNumQueries(1):
+            self.assertEqual(CountedPaginator(queryset, 10).count, 30)
+        Post.objects.create(text='Новый', author=self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(CountedPaginator(queryset, 10).count, 30)
+        cache.clear()
+        self.assertEqual(CountedPaginator(queryset, 10).count, 31)
+
+    def test_known_count_skips_database(self):
+        queryset = Post.objects.order_by('pk')
+        with self.assertNumQueries(0):
+            self.assertEqual(CountedPaginator(queryset, 10, count=7).count, 7)
+
+    @override_settings(PAGINATOR_ESTIMATE_THRESHOLD=10)
+    def test_big_table_uses_statistics(self):
+        """Для большой таблицы без фильтров число строк берётся из
+        статистики базы, а последняя страница не показывается."""
+        queryset = Post.objects.order_by('pk')
+        self.assertIsNone(estimated_rows(Post))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Post.objects.create(text='После ANALYZE', author=self.user)
+        paginator = CountedPaginator(queryset, 1)
+        self.assertEqual(paginator.count, 30)
+        self.assertTrue(paginator.count_is_estimate)
+        paginator.get_page(10)
+        self.assertEqual(paginator.page_window(10), [1, None, *range(7, 14),
+                                                     None])
+        filtered = Post.objects.filter(author=self.user).order_by('pk')
+        paginator = CountedPaginator(filtered, 1)
+        self.assertEqual(paginator.count, 31)
+        self.assertFalse(paginator.count_is_estimate)
+
+    @override_settings(PAGINATOR_ESTIMATE_THRESHOLD=10)
+    def test_stale_estimate_does_not_hide_pages(self):
+        """Статистика отстала (30 строк против 47): страницы за оценкой
+        открываются, а следующая определяется по самим строкам."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Post.objects.bulk_create(
+            Post(text=f'Свежий {i}', author=self.user) for i in range(17)
+        )
+        queryset = Post.objects.order_by('pk')
+        page = CountedPaginator(queryset, 10).get_page(4)
+        self.assertEqual(page.number, 4)
+        self.assertTrue(page.has_next())
+        page = CountedPaginator(queryset, 10).get_page(5)
+        self.assertEqual(page.number, 5)
+        self.assertEqual(len(page), 7)
+        self.assertFalse(page.has_next())
+        paginator = CountedPaginator(queryset, 10)
+        page = paginator.get_page(9)
+        self.assertEqual((page.number, len(page)), (5, 7))
+        self.assertEqual(paginator.count, 47)
+        self.assertFalse(paginator.count_is_estimate)
+
+    @override_settings(PAGINATOR_WINDOW=2)
+    def test_page_window(self):
+        paginator = CountedPaginator(list(range(1000)), 1)
+        self.assertEqual(paginator.page_window(1), [1, 2, 3, None, 1000])
+        self.assertEqual(
+            paginator.page_window(500),
+            [1, None, 498, 499, 500, 501, 502, None, 1000],
+        )
+        self.assertEqual(paginator.page_window(4), [1, 2, 3, 4, 5, 6, None,
+                                                    1000])
+        self.assertEqual(CountedPaginator([1, 2], 1).page_window(2), [1, 2])
+
+    @override_settings(PAGINATOR_WINDOW=1)
+    def test_page_strip_is_windowed(self):
+        response = Client().get(
+            reverse('posts:index'), {'page': 8, 'limit': 2}
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(
+            page_obj.paginator.page_window(page_obj.number),
+            [1, None, 7, 8, 9, None, 15],
+        )
+        self.assertContains(response, '&hellip;', count=2)
+        self.assertContains(response, '?page=15')
+        self.assertNotContains(response, '?page=10"')
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Запросы сессии и пользователя авторизованного клиента входят в бюджет,
+# как и поиск объекта по ключу для ETag у страниц группы, автора и поста.
+# Лента подписок сначала выбирает популярных авторов из подписок: их посты
+# читаются отдельно по каждому автору.
+QUERY_BUDGETS = {
+    'posts:index': 3,
+    'posts:group_list': 5,
+    'posts:profile': 6,
+    'posts:post_detail': 5,
+    'posts:follow_index': 4,
+}
+
+
+class FeedQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='budget_author', first_name='Имя', last_name='Фамилия'
+        )
+        cls.reader = User.objects.create_user(username='budget_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='budget-group', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(10):
+            post = Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+            Comment.objects.create(
+                post=post, author=cls.reader, text=f'Комментарий {i}'
+            )
+        cls.post = post
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def urls(self):
+        return {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse(
+                'posts:group_list', args=[self.group.slug]
+            ),
+            'posts:profile': reverse(
+                'posts:profile', args=[self.author.username]
+            ),
+            'posts:post_detail': reverse(
+                'posts:post_detail', args=[self.post.pk]
+            ),
+            'posts:follow_index': reverse('posts:follow_index'),
+        }
+
+    def test_views_fit_query_budget(self):
+        """Число запросов страницы не зависит от числа постов на ней."""
+        for name, url in self.urls().items():
+            with self.subTest(view=name):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(
+                    len(queries), QUERY_BUDGETS[name],
+                    '\n'.join(query['sql'] for query in queries),
+                )
+
+    def test_feed_shows_comments_count(self):
+        """Карточка ленты получает число комментариев без доп. запросов."""
+        response = self.client.get(reverse('posts:index'))
+        for post in response.context['page_obj']:
+            self.assertEqual(post.comments_count, 1)
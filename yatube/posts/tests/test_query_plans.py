@@ -0,0 +1,43 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+
+from .. import benchmark, query_plans
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class QueryPlanTests(TestCase):
+    def test_problems(self):
+        """Полный проход и временная сортировка считаются проблемой."""
+        plan = [
+            'SCAN posts_post',
+            'SCAN posts_post USING INDEX posts_post_pub_date_131c7f8d',
+            'SEARCH posts_post USING INDEX post_author_pub_date_idx '
+            '(author_id=?)',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ]
+        self.assertEqual(
+            query_plans.problems(plan),
+            ['SCAN posts_post', 'USE TEMP B-TREE FOR ORDER BY'],
+        )
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент и страницы поста идут по индексам."""
+        cache.clear()
+        dataset = benchmark.seed(
+            users=6, groups=2, posts=30, comments=30, follows=3,
+            image_ratio=0,
+        )
+        report = query_plans.check(dataset)
+        self.assertEqual(
+            {entry['view'] for entry in report},
+            {'index', 'group_posts', 'profile', 'post_detail',
+             'follow_index'},
+        )
+        failed = [
+            (entry['url'], entry['sql'], entry['problems'])
+            for entry in report if entry['problems']
+        ]
+        self.assertEqual(failed, [])
@@ -0,0 +1,97 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post, SearchEntry
+from ..search import tokenize
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='searcher')
+        cls.post_match = Post.objects.create(
+            text='Кошки любят тёплые подоконники', author=cls.user
+        )
+        cls.comment_match = Post.objects.create(
+            text='Фотография дня', author=cls.user
+        )
+        Comment.objects.create(
+            post=cls.comment_match, author=cls.user, text='Какая кошка!'
+        )
+        cls.other = Post.objects.create(
+            text='Running tests in English', author=cls.user
+        )
+        cls.url = reverse('posts:search')
+
+    def setUp(self):
+        self.client = Client()
+
+    def found(self, query):
+        response = self.client.get(self.url, {'q': query})
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_tokenize_folds_word_forms(self):
+        """Разные формы слова дают один терм."""
+        self.assertEqual(tokenize('Кошки'), tokenize('кошка'))
+        self.assertEqual(tokenize('тёплые'), tokenize('теплый'))
+        self.assertEqual(tokenize('tests'), tokenize('test'))
+
+    def test_search_ranks_post_text_above_comments(self):
+        """Совпадение в тексте поста выше совпадения в комментарии."""
+        self.assertEqual(
+            self.found('кошками'),
+            [self.post_match.pk, self.comment_match.pk],
+        )
+
+    def test_search_requires_all_terms(self):
+        """Пост находится, только если в нём есть все слова запроса."""
+        self.assertEqual(self.found('running test'), [self.other.pk])
+        self.assertEqual(self.found('running кошка'), [])
+        self.assertEqual(self.found(''), [])
+
+    def test_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении."""
+        post = Post.objects.create(text='Лошади', author=self.user)
+        post.text = 'Собаки'
+        post.save()
+        self.assertEqual(self.found('лошадь'), [])
+        self.assertEqual(self.found('собака'), [post.pk])
+        post_id = post.pk
+        post.delete()
+        self.assertFalse(
+            SearchEntry.objects.filter(post_id=post_id).exists()
+        )
+
+    def test_rebuild_command(self):
+        """Команда rebuild_search_index восстанавливает индекс."""
+        SearchEntry.objects.all().delete()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(
+            self.found('кошка'),
+            [self.post_match.pk, self.comment_match.pk],
+        )
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт через индекс."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'кошками'}
+        )
+        self.assertEqual(
+            set(response.context['cl'].result_list),
+            {self.post_match, self.comment_match},
+        )
+        response = self.client.get(
+            reverse('admin:posts_comment_changelist'), {'q': 'кошки'}
+        )
+        self.assertEqual(len(response.context['cl'].result_list), 1)
@@ -0,0 +1,73 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, TASKS_EAGER=True)
+class ThumbnailTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='thumb_author')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create_post(self):
+        self.client.post(reverse('posts:post_create'), data={
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'
+            ),
+        })
+        return Post.objects.get(author=self.user)
+
+    def test_thumbnail_generated_on_save(self):
+        """Превью готовится после сохранения формы и выводится в ленте."""
+        post = self.create_post()
+        url = post.thumbnail_urls['card']
+        self.assertTrue(url.startswith(settings.MEDIA_URL))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, url)
+
+    def test_feed_falls_back_to_original_image(self):
+        """Пока превью нет, лента выводит исходную картинку."""
+        post = self.create_post()
+        Post.objects.filter(pk=post.pk).update(thumbnails='')
+        cache.clear()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, post.image.url)
+
+    def test_command_fills_missing_thumbnails(self):
+        """Команда pregenerate_thumbnails готовит недостающие превью."""
+        post = self.create_post()
+        Post.objects.filter(pk=post.pk).update(thumbnails='')
+        call_command('pregenerate_thumbnails', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertIn('card', post.thumbnail_urls)
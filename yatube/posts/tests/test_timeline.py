@@ -0,0 +1,118 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry
+from ..timeline import timeline_posts
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.other_reader = User.objects.create_user(username='other_reader')
+        cls.author = User.objects.create_user(username='timeline_author')
+        cls.old_post = Post.objects.create(
+            text='Старый пост', author=cls.author
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def follow(self):
+        self.client.get(reverse(
+            'posts:profile_follow', args=[self.author.username]
+        ))
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту уже опубликованные посты."""
+        self.follow()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.old_post
+        ).exists())
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает только в ленты подписчиков."""
+        self.follow()
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertIn(post, timeline_posts(self.reader))
+        self.assertNotIn(post, timeline_posts(self.other_reader))
+
+    def test_unfollow_prunes_timeline(self):
+        """Отписка очищает ленту от постов автора."""
+        self.follow()
+        self.client.get(reverse(
+            'posts:profile_unfollow', args=[self.author.username]
+        ))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_hot_author_is_read_on_demand(self):
+        """Посты популярного автора подмешиваются при чтении."""
+        Follow.objects.create(user=self.other_reader, author=self.author)
+        self.follow()
+        post = Post.objects.create(text='Пост для всех', author=self.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=post).exists()
+        )
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_hot_author_posts_are_merged_in_order(self):
+        """Посты из ленты и популярного автора идут вперемешку по дате
+        и на страницах по курсору."""
+        hot = User.objects.create_user(username='hot_author')
+        Follow.objects.create(user=self.other_reader, author=hot)
+        Follow.objects.create(user=self.reader, author=hot)
+        self.follow()
+        posts = [
+            Post.objects.create(
+                text=f'Пост {number}',
+                author=hot if number % 2 else self.author,
+            )
+            for number in range(5)
+        ]
+        entry = TimelineEntry.objects.get(post=posts[0])
+        self.assertEqual(entry.pub_date, posts[0].pub_date)
+        url = reverse('posts:follow_index')
+        first = self.client.get(url, {'limit': 3}).context['page_obj']
+        second = self.client.get(url, {
+            'limit': 3, 'cursor': first.next_cursor,
+        }).context['page_obj']
+        self.assertEqual(
+            list(first) + list(second),
+            posts[::-1] + [self.old_post],
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_posts_stay_when_author_is_no_longer_hot(self):
+        """Пост, опубликованный, пока автор был популярным, остаётся
+        в ленте после того, как подписчиков стало меньше лимита."""
+        Follow.objects.create(user=self.other_reader, author=self.author)
+        self.follow()
+        post = Post.objects.create(text='Пост для всех', author=self.author)
+        Follow.objects.filter(user=self.other_reader).delete()
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+
+    def test_rebuild_command_restores_entries(self):
+        """Команда rebuild_timelines восстанавливает ленты."""
+        self.follow()
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertIn(self.old_post, timeline_posts(self.reader))
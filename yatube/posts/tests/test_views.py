@@ -121,6 +121,7 @@ class PostPagesTests(TestCase):
         self.assertNotEqual(self.group_for_user2,
                             response.context['group'])
         self.assertEqual(post_image_0, self.post.image)
+        self.assertNotContains(response, 'Все записи группы')
 
     def test_post_profile_show_correct_context(self):
         """Шаблон profile сформирован с правильным контекстом."""
@@ -0,0 +1,50 @@
+"""Фоновая подготовка превью картинок постов.
+
+Превью канонических размеров из `settings.POST_THUMBNAILS` режутся
+фоновой задачей (`posts.tasks.generate_thumbnails`) после коммита
+поста, а их адреса записываются в `Post.thumbnails`. Шаблоны выводят
+готовый адрес, поэтому ни один запрос не декодирует картинку и не
+ходит в KV-хранилище sorl.
+"""
+import json
+import logging
+
+from django.conf import settings
+from sorl.thumbnail import get_thumbnail
+
+from . import feed_cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+
+def sizes():
+    return getattr(settings, 'POST_THUMBNAILS', {})
+
+
+def render_thumbnails(image):
+    """Режет все канонические размеры и возвращает их адреса."""
+    urls = {}
+    if not image or not image.storage.exists(image.name):
+        return urls
+    for name, (geometry, options) in sizes().items():
+        urls[name] = get_thumbnail(image, geometry, **options).url
+    return urls
+
+
+def generate(post_id, image_name):
+    """Превью для картинки, которая была у поста на момент сохранения.
+    Ошибка картинки не лечится повтором, поэтому только пишется в лог."""
+    try:
+        field = Post._meta.get_field('image')
+        image = field.attr_class(Post(pk=post_id), field, image_name)
+        urls = json.dumps(render_thumbnails(image)) if image_name else ''
+        updated = Post.objects.filter(
+            pk=post_id, image=image_name
+        ).update(thumbnails=urls)
+        if updated:
+            feed_cache.bump_post(
+                Post.objects.only('author', 'group').get(pk=post_id)
+            )
+    except Exception:
+        logger.exception('Не удалось подготовить превью поста %s', post_id)
@@ -0,0 +1,233 @@
+"""Материализованная лента подписок.
+
+Пост раскладывается по лентам подписчиков в момент публикации
+(fan-out-on-write), поэтому страница `/follow/` читает одну таблицу
+вместо соединения Follow и Post. Авторы, у которых подписчиков больше
+`TIMELINE_FANOUT_LIMIT`, не раскладываются: их посты подмешиваются
+в ленту при чтении (fan-out-on-read). Когда после отписки автор
+опускается до лимита, его посты раскладываются по лентам подписчиков
+задним числом (`backfill_followers`): иначе опубликованное, пока он
+был популярным, пропало бы из лент.
+
+Страница ленты (`Timeline`) не сортирует объединение в базе: посты
+читаются по индексу из материализованной ленты и отдельно по каждому
+популярному автору, а сливаются по порядку уже в Python.
+"""
+from heapq import merge
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+BATCH_SIZE = 1000
+
+
+def fanout_limit():
+    return getattr(settings, 'TIMELINE_FANOUT_LIMIT', None)
+
+
+def backfill_limit():
+    return getattr(settings, 'TIMELINE_BACKFILL_LIMIT', 1000)
+
+
+def is_hot_author(author_id):
+    """Автор с огромным числом подписчиков читается из Post напрямую."""
+    limit = fanout_limit()
+    if limit is None:
+        return False
+    return UserStats.objects.filter(
+        user_id=author_id, followers_count__gt=limit
+    ).exists()
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out_post(post):
+    """Добавляет новый пост в ленты всех подписчиков автора."""
+    if is_hot_author(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    with transaction.atomic():
+        _bulk_insert(
+            TimelineEntry(
+                user_id=user_id, post_id=post.pk, author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in followers.iterator()
+        )
+
+
+def backfill(user_id, author_id):
+    """Заполняет ленту последними постами автора после подписки."""
+    if is_hot_author(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).order_by('-pub_date', '-pk').values_list('pk', 'pub_date')
+    with transaction.atomic():
+        _bulk_insert(
+            TimelineEntry(user_id=user_id, post_id=post_id,
+                          author_id=author_id, pub_date=pub_date)
+            for post_id, pub_date in posts[:backfill_limit()]
+        )
+
+
+def left_hot_set(author_id):
+    """Опустился ли автор ровно до лимита: вызывается после уменьшения
+    числа подписчиков на одного."""
+    limit = fanout_limit()
+    if limit is None:
+        return False
+    return UserStats.objects.filter(
+        user_id=author_id, followers_count=limit
+    ).exists()
+
+
+def backfill_followers(author_id):
+    """Раскладывает последние посты автора, переставшего быть
+    популярным, по лентам всех его подписчиков."""
+    if is_hot_author(author_id):
+        return
+    posts = list(Post.objects.filter(
+        author_id=author_id
+    ).order_by('-pub_date', '-pk').values_list('pk', 'pub_date')[
+        :backfill_limit()
+    ])
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    with transaction.atomic():
+        _bulk_insert(
+            TimelineEntry(user_id=user_id, post_id=post_id,
+                          author_id=author_id, pub_date=pub_date)
+            for user_id in followers.iterator()
+            for post_id, pub_date in posts
+        )
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild(usernames=None):
+    """Пересобирает ленты (всех или указанных пользователей) по
+    подпискам. Возвращает число подписок."""
+    follows = Follow.objects.order_by('pk')
+    entries = TimelineEntry.objects.all()
+    if usernames:
+        follows = follows.filter(user__username__in=usernames)
+        entries = entries.filter(user__username__in=usernames)
+    entries.delete()
+    rebuilt = 0
+    for user_id, author_id in follows.values_list(
+        'user_id', 'author_id'
+    ).iterator():
+        backfill(user_id, author_id)
+        rebuilt += 1
+    return rebuilt
+
+
+def hot_authors_followed(user):
+    """Авторы из подписок пользователя, чьи посты не раскладываются."""
+    limit = fanout_limit()
+    if limit is None:
+        return Follow.objects.none().values('author_id')
+    return Follow.objects.filter(
+        user=user, author__stats__followers_count__gt=limit
+    ).values('author_id')
+
+
+def timeline_posts(user):
+    """Все посты ленты подписок одним запросом, без порядка; страницы
+    читаются через `Timeline`."""
+    in_timeline = TimelineEntry.objects.filter(user=user).values('post_id')
+    if fanout_limit() is None:
+        return Post.objects.filter(pk__in=in_timeline)
+    return Post.objects.filter(
+        Q(pk__in=in_timeline) | Q(author_id__in=hot_authors_followed(user))
+    )
+
+
+class Timeline:
+    """Лента подписок пользователя для `TimelinePaginator`.
+
+    Посты из материализованной ленты читаются соединением с ней
+    в порядке индекса (user, -pub_date, -post), посты каждого
+    популярного автора - по post_author_pub_date_idx; из каждого
+    источника берётся не больше `limit` строк, и они сливаются
+    по (pub_date, id). `posts` - queryset моделей или `.values()`
+    с `id` и `pub_date`. Записи популярных авторов, оставшиеся в ленте
+    с тех пор, как они были обычными, не читаются: их посты уже идут
+    из Post.
+    """
+
+    def __init__(self, user, posts):
+        self.user = user
+        self.posts = posts
+        self.hot_author_ids = list(
+            hot_authors_followed(user).values_list('author_id', flat=True)
+        )
+
+    def _sources(self):
+        """Условие каждого источника и поля его ключа (дата, id)."""
+        entries = Q(timeline_entries__user=self.user)
+        if self.hot_author_ids:
+            entries &= ~Q(author_id__in=self.hot_author_ids)
+        yield (entries, 'timeline_entries__pub_date',
+               'timeline_entries__post__id')
+        for author_id in self.hot_author_ids:
+            yield Q(author_id=author_id), 'pub_date', 'pk'
+
+    @staticmethod
+    def key(row):
+        if isinstance(row, dict):
+            return row['pub_date'], row['id']
+        return row.pub_date, row.pk
+
+    def fetch(self, limit, cursor=None, backwards=False):
+        """Первые `limit` постов за курсором (date, pk), от новых
+        к старым; с `backwards` - перед курсором, от старых к новым."""
+        lookup = 'gt' if backwards else 'lt'
+        parts = []
+        for condition, date_field, id_field in self._sources():
+            if cursor is not None:
+                date, pk = cursor
+                # Одним filter(): иначе каждое условие по записям ленты
+                # получило бы своё соединение.
+                condition &= (
+                    Q(**{f'{date_field}__{lookup}': date})
+                    | Q(**{date_field: date, f'{id_field}__{lookup}': pk})
+                )
+            ordering = (date_field, id_field)
+            if not backwards:
+                ordering = tuple(f'-{field}' for field in ordering)
+            parts.append(list(
+                self.posts.filter(condition).order_by(*ordering)[:limit]
+            ))
+        return list(islice(
+            merge(*parts, key=self.key, reverse=not backwards), limit
+        ))
+
+    def count(self):
+        entries = TimelineEntry.objects.filter(user=self.user)
+        if not self.hot_author_ids:
+            return entries.count()
+        return entries.exclude(
+            author_id__in=self.hot_author_ids
+        ).count() + Post.objects.filter(
+            author_id__in=self.hot_author_ids
+        ).count()
+
+    def __getitem__(self, index):
+        # Постраничный вывод по номеру: Paginator берёт срез.
+        return self.fetch(index.stop)[index.start or 0:]
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import feeds, views
 
 from django.conf import settings
 from django.conf.urls.static import static
@@ -10,15 +10,40 @@ urlpatterns = [
     # Главная страница
     path('', views.index, name='index'),
 
+    # Следующие порции лент для подгрузки при прокрутке
+    path('fragment/', views.index_fragment, name='index_fragment'),
+    path('group/<slug:slug>/fragment/', views.group_fragment,
+         name='group_fragment'),
+    path('profile/<str:username>/fragment/', views.profile_fragment,
+         name='profile_fragment'),
+    path('follow/fragment/', views.follow_fragment, name='follow_fragment'),
+
     # Посты одного автора
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
 
     # Профайл автора
     path('profile/<str:username>/', views.profile, name='profile'),
 
+    # RSS и Atom: общая лента, группа, автор
+    path('rss/', feeds.index_rss, name='index_rss'),
+    path('atom/', feeds.index_atom, name='index_atom'),
+    path('group/<slug:slug>/rss/', feeds.group_rss, name='group_rss'),
+    path('group/<slug:slug>/atom/', feeds.group_atom, name='group_atom'),
+    path('profile/<str:username>/rss/', feeds.profile_rss,
+         name='profile_rss'),
+    path('profile/<str:username>/atom/', feeds.profile_atom,
+         name='profile_atom'),
+
     # Просмотр записи по id
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
 
+    # Следующая порция комментариев к записи
+    path('posts/<int:post_id>/comments/', views.comment_list,
+         name='comment_list'),
+
+    # Поиск по постам и комментариям
+    path('search/', views.post_search, name='search'),
+
     # Добавление нового поста
     path('create/', views.post_create, name='post_create'),
 
@@ -1,62 +1,151 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 
 from .models import Post, Group, User, Follow
+from . import feed_cache, follow_graph, search
+from .counters import user_stats
 from .forms import PostForm, CommentForm
+from .http_cache import (
+    author_scopes, conditional_page, follow_scopes, group_scopes, index_scopes,
+    post_scopes, profile_scopes,
+)
+from .paginators import (
+    CURSOR_PARAM, LIMIT_PARAM, CountedPaginator, TimelinePaginator, paginate,
+    paginate_comments, per_page,
+)
+from .queries import (
+    feed_posts, follow_feed, group_feed, index_feed, post_comments,
+    profile_feed,
+)
 from django.contrib.auth.models import User
 
 
-def index(request):
-    template = 'posts/index.html'
-    posts = Post.objects.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    context = {
+def feed_context(request, page_obj, fragment_url, cache, **extra):
+    """Общий контекст страницы ленты и её фрагмента. `next_fragment_url`
+    - адрес следующей порции для подгрузки и подсказки prefetch."""
+    next_fragment_url = None
+    if page_obj.next_cursor:
+        query = {CURSOR_PARAM: page_obj.next_cursor}
+        if LIMIT_PARAM in request.GET:
+            query[LIMIT_PARAM] = page_obj.paginator.per_page
+        next_fragment_url = f'{fragment_url}?{urlencode(query)}'
+    return {
         'page_obj': page_obj,
+        'feed_cache': cache,
+        'next_fragment_url': next_fragment_url,
+        **extra,
     }
-    return render(request, template, context)
 
 
-def group_posts(request, slug):
+def render_feed(request, template, context):
+    """Рендерит ленту и подсказывает браузеру заранее загрузить
+    следующий фрагмент (заголовок Link)."""
+    response = render(request, template, context)
+    if context['next_fragment_url']:
+        response['Link'] = f'<{context["next_fragment_url"]}>; rel=prefetch'
+    return response
+
+
+def render_fragment(request, context):
+    """Только карточки постов и ссылка на следующую порцию: без шапки,
+    подвала и номеров страниц."""
+    return render_feed(request, 'posts/includes/post_fragment.html', context)
+
+
+def index_context(request):
+    cache = feed_cache.index_cache(request)
+    page_obj = paginate(
+        request, index_feed(), per_page(request, 'index'), fragment=cache
+    )
+    return feed_context(
+        request, page_obj, reverse('posts:index_fragment'), cache
+    )
+
+
+@conditional_page(index_scopes)
+def index(request):
+    return render_feed(request, 'posts/index.html', index_context(request))
+
+
+@conditional_page(index_scopes)
+def index_fragment(request):
+    return render_fragment(request, index_context(request))
+
+
+def group_context(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    cache = feed_cache.group_cache(request, group)
+    page_obj = paginate(
+        request, group_feed(group), per_page(request, 'group_list'),
+        count=group.posts_count, fragment=cache,
+    )
+    return feed_context(
+        request, page_obj, reverse('posts:group_fragment', args=[slug]),
+        cache, group=group, hide_group_link=True,
+    )
 
-    context = {
-        'group': group,
-        'page_obj': page_obj,
-    }
-    return render(request, 'posts/group_list.html', context)
+
+@conditional_page(group_scopes)
+def group_posts(request, slug):
+    return render_feed(
+        request, 'posts/group_list.html', group_context(request, slug)
+    )
 
 
+@conditional_page(group_scopes)
+def group_fragment(request, slug):
+    return render_fragment(request, group_context(request, slug))
+
+
+def profile_context(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    stats = user_stats(author)
+    cache = feed_cache.profile_cache(request, author)
+    page_obj = paginate(
+        request, profile_feed(author), per_page(request, 'profile'),
+        count=stats.posts_count, fragment=cache,
+    )
+    return feed_context(
+        request, page_obj,
+        reverse('posts:profile_fragment', args=[author.username]),
+        cache, author=author, posts_count=stats.posts_count,
+        hide_author_link=True,
+    )
+
+
+@conditional_page(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    user = request.user
-    posts = author.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    following = (user.is_authenticated
-                 and Follow.objects.filter(user=user, author=author).exists())
-    context = {
-        'page_obj': page_obj,
-        'author': author,
-        'posts_count': author.posts.count(),
-        'following': following
-    }
-    return render(request, 'posts/profile.html', context)
+    context = profile_context(request, username)
+    context['following'] = follow_graph.is_following(
+        request.user.pk, context['author'].pk
+    )
+    context['suggestions'] = follow_graph.suggested_authors(request.user)
+    return render_feed(request, 'posts/profile.html', context)
 
 
+@conditional_page(author_scopes)
+def profile_fragment(request, username):
+    return render_fragment(request, profile_context(request, username))
+
+
+@conditional_page(post_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    comments = paginate_comments(
+        request, post_comments(post), settings.COMMENTS_PER_PAGE
+    )
     comments_form = CommentForm(request.POST or None)
-    author = post.author
-    posts_count = author.posts.count()
+    posts_count = user_stats(post.author).posts_count
     context = {
         'post': post,
         'posts_count': posts_count,
@@ -66,7 +155,56 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@conditional_page(post_scopes)
+def comment_list(request, post_id):
+    """Следующая порция комментариев для кнопки «Показать ещё»:
+    HTML-фрагмент или JSON при `?format=json`."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = paginate_comments(
+        request, post_comments(post), settings.COMMENTS_PER_PAGE
+    )
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created.isoformat(),
+                }
+                for comment in comments
+            ],
+            'next_cursor': comments.next_cursor,
+        })
+    context = {
+        'post': post,
+        'comments': comments,
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = CountedPaginator(
+        search.ranked(query), per_page(request, 'search')
+    )
+    page_obj = paginator.get_page(request.GET.get('page'))
+    found = feed_posts(
+        Post.objects.filter(pk__in=[row['post_id'] for row in page_obj])
+    ).in_bulk()
+    page_obj.object_list = [
+        found[row['post_id']] for row in page_obj if row['post_id'] in found
+    ]
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     title = 'Добавить запись'
     form = PostForm(
@@ -86,6 +224,7 @@ def post_create(request):
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     title = 'Редактировать запись'
     post = get_object_or_404(
@@ -102,7 +241,8 @@ def post_edit(request, post_id):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        # Счётчики в строке поста меняются в обход формы, не затираем их.
+        post.save(update_fields=['text', 'group', 'image', 'author'])
         return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
@@ -113,6 +253,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(
         Post,
@@ -127,22 +268,34 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def follow_context(request):
+    cache = feed_cache.follow_cache(request)
+    page_obj = paginate(
+        request, follow_feed(request.user),
+        per_page(request, 'follow_index'), fragment=cache,
+        paginator_class=TimelinePaginator,
+    )
+    return feed_context(
+        request, page_obj, reverse('posts:follow_fragment'), cache
+    )
+
+
 @login_required
+@conditional_page(follow_scopes)
 def follow_index(request):
-    template = 'posts/follow.html'
-    posts = Post.objects.filter(
-        author__following__user=request.user
-    ).select_related('author', 'group')
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    context = {
-        'page_obj': page_obj
-    }
-    return render(request, template, context)
+    context = follow_context(request)
+    context['suggestions'] = follow_graph.suggested_authors(request.user)
+    return render_feed(request, 'posts/follow.html', context)
+
+
+@login_required
+@conditional_page(follow_scopes)
+def follow_fragment(request):
+    return render_fragment(request, follow_context(request))
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     follow_author = get_object_or_404(User, username=username)
     follow_user = request.user
@@ -155,6 +308,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
@@ -45,11 +45,14 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -61,12 +64,24 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# Скомпилированные шаблоны хранятся в памяти процесса. Чтобы правки
+# шаблонов подхватывались без перезапуска (при разработке), задайте
+# YATUBE_TEMPLATE_CACHE=0.
+TEMPLATE_CACHE = os.getenv('YATUBE_TEMPLATE_CACHE', '1') == '1'
+if TEMPLATE_CACHE:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -83,13 +98,79 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# База выбирается переменной окружения YATUBE_DB: sqlite для одного узла
+# или postgresql. Параметры подключения - YATUBE_DB_NAME, YATUBE_DB_USER,
+# YATUBE_DB_PASSWORD, YATUBE_DB_HOST, YATUBE_DB_PORT.
+DATABASE_ENGINES = {
+    'sqlite': 'django.db.backends.sqlite3',
+    'postgresql': 'django.db.backends.postgresql',
+}
+DATABASE_ENGINE = os.getenv('YATUBE_DB', 'sqlite')
+
+# Соединение живёт между запросами столько секунд, а не открывается
+# заново на каждый запрос.
+DATABASE_CONN_MAX_AGE = int(os.getenv('YATUBE_DB_CONN_MAX_AGE', 60))
+
+# SQLite: сколько секунд писатель ждёт чужую блокировку вместо ошибки
+# "database is locked", и PRAGMA для каждого нового соединения. В режиме
+# WAL чтение лент не ждёт записи постов и комментариев.
+SQLITE_BUSY_TIMEOUT = 20
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+}
+
+# YATUBE_DB_POOL=pgbouncer: соединения PostgreSQL идут через пул
+# PgBouncer в режиме транзакций, где серверные курсоры недоступны.
+DATABASE_POOL = os.getenv('YATUBE_DB_POOL', '')
+
+if DATABASE_ENGINE == 'sqlite':
+    DATABASE_DEFAULT = {
+        'NAME': str(os.path.join(BASE_DIR, "db.sqlite3")),
+        'OPTIONS': {'timeout': SQLITE_BUSY_TIMEOUT},
+    }
+else:
+    DATABASE_DEFAULT = {
+        'NAME': 'yatube',
+        'HOST': 'localhost',
+        'PORT': '6432' if DATABASE_POOL == 'pgbouncer' else '5432',
+        'OPTIONS': {'connect_timeout': 5},
+        'DISABLE_SERVER_SIDE_CURSORS': DATABASE_POOL == 'pgbouncer',
+    }
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': str(os.path.join(BASE_DIR, "db.sqlite3")),
+        **DATABASE_DEFAULT,
+        'ENGINE': DATABASE_ENGINES[DATABASE_ENGINE],
+        'NAME': os.getenv('YATUBE_DB_NAME', DATABASE_DEFAULT['NAME']),
+        'USER': os.getenv('YATUBE_DB_USER', ''),
+        'PASSWORD': os.getenv('YATUBE_DB_PASSWORD', ''),
+        'HOST': os.getenv('YATUBE_DB_HOST', DATABASE_DEFAULT.get('HOST', '')),
+        'PORT': os.getenv('YATUBE_DB_PORT', DATABASE_DEFAULT.get('PORT', '')),
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
     }
 }
 
+# Реплики только для чтения: YATUBE_DB_REPLICAS - файлы SQLite или хосты
+# PostgreSQL через запятую. Пишет только default; на реплики уходят
+# чтения безопасных HTTP-запросов (core.db_router).
+DATABASE_REPLICAS = []
+for number, location in enumerate(
+    filter(None, os.getenv('YATUBE_DB_REPLICAS', '').split(','))
+):
+    DATABASE_REPLICAS.append(f'replica_{number}')
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'NAME' if DATABASE_ENGINE == 'sqlite' else 'HOST': location.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+# После записи браузер столько секунд читает основную базу, чтобы автор
+# сразу увидел свой пост, пока реплики догоняют.
+REPLICA_STICKY_SECONDS = 15
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -138,12 +219,139 @@ LOGIN_REDIRECT_URL = 'posts:index'
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+DEFAULT_FROM_EMAIL = os.getenv('YATUBE_FROM_EMAIL', 'noreply@yatube.ru')
+# Адрес сайта для ссылок в письмах.
+SITE_URL = os.getenv('YATUBE_SITE_URL', 'http://127.0.0.1:8000')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Кеш выбирается переменной окружения YATUBE_CACHE. LocMemCache у каждого
+# воркера свой, поэтому в бою нужен общий: db или memcached.
+# Для db таблицу создаёт `python manage.py createcachetable`.
+# memcached работает через пакет python-memcached из requirements.txt.
+# FileBasedCache не предлагается: его add() - это проверка и запись
+# без блокировки, а на атомарном add() держатся защита от набегания
+# (core.cache) и ограничение частоты запросов (core.ratelimit).
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'yatube_cache'),
+    'memcached': (
+        'django.core.cache.backends.memcached.MemcachedCache',
+        '127.0.0.1:11211',
+    ),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[
+    os.getenv('YATUBE_CACHE', 'locmem')
+]
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('YATUBE_CACHE_LOCATION', CACHE_LOCATION),
     }
 }
+# Сколько секунд после истечения отдавать устаревший фрагмент, пока
+# один воркер его пересчитывает, и сколько держится блокировка пересчёта.
+CACHE_STALE_GRACE = 60
+CACHE_LOCK_TIMEOUT = 10
+
+# Лента подписок: авторы, у которых подписчиков больше этого числа,
+# не раскладываются по лентам при публикации, а читаются напрямую.
+TIMELINE_FANOUT_LIMIT = 5000
+# Сколько последних постов автора добавить в ленту при подписке.
+TIMELINE_BACKFILL_LIMIT = 1000
+
+# Граф подписок (posts.follow_graph): массивы id подписок и подписчиков
+# живут в кеше FOLLOW_GRAPH_TIMEOUT секунд и сбрасываются при подписке
+# и отписке; списки длиннее FOLLOW_GRAPH_MAX_IDS не кешируются.
+FOLLOW_GRAPH_TIMEOUT = 60 * 60 * 24
+FOLLOW_GRAPH_MAX_IDS = 50000
+# Рекомендации авторов пересчитывает `manage.py refresh_follow_suggestions`
+# по расписанию (cron); список живёт дольше интервала запуска.
+FOLLOW_SUGGESTIONS_LIMIT = 20
+FOLLOW_SUGGESTIONS_SHOWN = 5
+FOLLOW_SUGGESTIONS_TIMEOUT = 60 * 60 * 48
+
+# Фрагменты лент инвалидируются поколениями, поэтому TTL может быть долгим.
+FEED_CACHE_TIMEOUT = 60 * 5
+
+# Постов на странице ленты по имени view. Клиент может попросить
+# другой размер через `?limit=`, но не больше POSTS_MAX_PER_PAGE.
+POSTS_PER_PAGE = {
+    'index': 10,
+    'group_list': 10,
+    'profile': 10,
+    'follow_index': 10,
+    'search': 10,
+}
+POSTS_PER_PAGE_DEFAULT = 10
+POSTS_MAX_PER_PAGE = 50
+
+# Постраничный вывод со смещением (`?page=N`, поиск): число строк
+# кешируется на PAGINATOR_COUNT_TIMEOUT секунд, а для таблицы целиком
+# больше PAGINATOR_ESTIMATE_THRESHOLD строк берётся оценка из статистики
+# базы. Полоса номеров показывает PAGINATOR_WINDOW страниц по обе
+# стороны от текущей, первую и последнюю.
+PAGINATOR_COUNT_TIMEOUT = 60
+PAGINATOR_ESTIMATE_THRESHOLD = 100000
+PAGINATOR_WINDOW = 3
+
+# Комментарии к посту выводятся порциями от новых к старым.
+COMMENTS_PER_PAGE = 20
+
+# Доля запросов, для которых замеряются SQL, шаблоны и кеш (заголовок
+# Server-Timing, лог core.instrumentation, сводка core:instrumentation_stats).
+INSTRUMENTATION_SAMPLE_RATE = float(os.getenv(
+    'YATUBE_SAMPLE_RATE', 1 if DEBUG else 0.01
+))
+
+# JSON API: размер страницы по умолчанию и потолок для `?limit=`.
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+# Сколько последних постов отдают RSS и Atom.
+SYNDICATION_ITEMS = 20
+
+# Сколько секунд общий кеш (обратный прокси) может отдавать анонимную
+# страницу без перепроверки ETag.
+PAGE_CACHE_SHARED_MAX_AGE = 10
+
+# ETag и Last-Modified страниц строятся из поколений в кеше и верны
+# только при общем кеше: с LocMemCache у каждого воркера свои поколения.
+# Без общего кеша заголовки включены лишь при DEBUG (один процесс).
+PAGE_ETAGS = os.getenv(
+    'YATUBE_PAGE_ETAGS',
+    '1' if DEBUG or 'locmem' not in CACHE_BACKEND else '0',
+) == '1'
+
+# Канонические размеры превью картинок постов: имя -> (геометрия, опции
+# sorl.thumbnail). Превью режутся фоновой задачей после сохранения.
+POST_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+# Фоновые задачи (core.tasks) выполняет `manage.py run_worker`.
+# В отладочном режиме (и в тестах) задачи выполняются сразу на месте
+# постановки, без воркера.
+TASKS_EAGER = DEBUG
+# Неудачная задача повторяется с паузой TASKS_RETRY_DELAY секунд,
+# удваивающейся с каждой попыткой, но не больше TASKS_MAX_ATTEMPTS раз.
+TASKS_MAX_ATTEMPTS = 5
+TASKS_RETRY_DELAY = 10
+# Через сколько секунд задачу пропавшего воркера заберёт другой.
+TASKS_LEASE = 60 * 5
+TASKS_POLL_INTERVAL = 1
+# Выполненные задачи хранятся столько дней, затем удаляются воркером.
+TASKS_KEEP_DONE_DAYS = 7
+
+# Уведомления о новых постах и комментариях копятся и уходят
+# дайджестом не чаще раза в NOTIFICATIONS_DIGEST_DELAY секунд.
+NOTIFICATIONS_DIGEST_DELAY = 60 * 15
+# Сколько получателей обслуживает одно соединение с почтовым сервером.
+NOTIFICATIONS_BATCH_SIZE = 100
+# Сколько событий перечислять в письме, остальные - одним числом.
+NOTIFICATIONS_DIGEST_ITEMS = 20
+# Не больше стольких событий одного автора за столько секунд
+# порождают уведомления.
+NOTIFICATIONS_RATE_LIMIT = (10, 60 * 60)
@@ -19,7 +19,9 @@ from django.conf.urls import include
 
 urlpatterns = [
     path('', include('posts.urls', namespace='yatube')),
+    path('api/v1/', include('api.urls', namespace='api')),
     path('admin/', admin.site.urls),
+    path('core/', include('core.urls', namespace='core')),
     path('auth/', include('users.urls', namespace='auth')),
     path('about/', include('about.urls', namespace='about')),
     path('auth/', include('django.contrib.auth.urls')),